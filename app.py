@@ -11,9 +11,10 @@ sys.path.append(str(BASE_DIR))
 
 from utils.config import setup_page_config, apply_custom_styles
 from utils.data_manager import initialize_session_state
+from utils.attachments import ensure_attachment_store
 from pages import (
     home, salao_herois, mapa_cristais, pergaminho_nomeacoes,
-    aprovacao_nomeacao, admin_herois, admin_missoes
+    aprovacao_nomeacao, admin_herois, admin_missoes, exportacao_historico
 )
 
 def main():
@@ -21,6 +22,7 @@ def main():
     setup_page_config()
     apply_custom_styles()  # Esta função agora oculta a navegação superior
     initialize_session_state()
+    ensure_attachment_store()
     
     # Sidebar de navegação
     create_navigation_sidebar()
@@ -47,6 +49,7 @@ def create_navigation_sidebar():
         "Aprovação da Nomeação": ("👑", aprovacao_nomeacao.show_page, True),
         "Gestão de Heróis": ("🔑", admin_herois.show_page, True),
         "Administração de Missões": ("🔑", admin_missoes.show_page, True),
+        "Exportação de Histórico": ("📤", exportacao_historico.show_page, True),
     }
     
     # Criar botões de navegação
@@ -82,6 +85,7 @@ def execute_current_page():
         "Aprovação da Nomeação": aprovacao_nomeacao.show_page,
         "Gestão de Heróis": admin_herois.show_page,
         "Administração de Missões": admin_missoes.show_page,
+        "Exportação de Histórico": exportacao_historico.show_page,
     }
     
     current_page = st.session_state.get('current_page', 'Home')
@@ -3,7 +3,9 @@ import pandas as pd
 from datetime import date
 import time
 from utils.ui_components import create_custom_header, show_loading_message, create_success_animation
-from utils.data_manager import load_data, save_data
+from utils.data_manager import load_data, append_data, update_data, delete_data, next_id
+from utils.indexes import get_hero_index, normalize_name
+from utils.recognition_view import refresh_hero, remove_hero
 from utils.config import logger
 
 def show_page():
@@ -26,7 +28,7 @@ def show_page():
 def show_edit_hero_form(df_herois):
     """Formulário de edição de herói"""
     hero_id = st.session_state['hero_to_edit_id']
-    hero_data = df_herois[df_herois['id_hero'] == hero_id].iloc[0]
+    hero_data = get_hero_index()['by_id'][int(hero_id)]
     
     st.markdown(f"### ✏️ **Editando Herói: _{hero_data['hero_name']}_**")
     
@@ -50,7 +52,7 @@ def show_edit_hero_form(df_herois):
             st.rerun()
         
         if submitted:
-            handle_hero_update(hero_id, hero_name, hero_team, df_herois)
+            handle_hero_update(hero_id, hero_name, hero_team)
 
 def show_add_hero_form(df_herois):
     """Formulário de adição de novo herói"""
@@ -85,7 +87,7 @@ def show_hero_statistics(df_herois):
     col1, col2, col3 = st.columns(3)
     col1.metric("👥 Total de Heróis", len(df_herois))
     col2.metric("🏢 Times Únicos", df_herois['hero_team'].nunique())
-    col3.metric("📅 Cadastros Hoje", len(df_herois[df_herois['start_date'] == date.today().strftime("%Y-%m-%d")]))
+    col3.metric("📅 Cadastros Hoje", int((df_herois['start_date'].dt.date == date.today()).sum()))
 
 def show_filtered_heroes(df_herois):
     """Mostra heróis com filtro por time"""
@@ -97,14 +99,15 @@ def show_filtered_heroes(df_herois):
     
     filtered_heroes = df_herois if selected_team == 'Todos' else df_herois[df_herois['hero_team'] == selected_team]
     
-    for index, row in filtered_heroes.iterrows():
+    for _, row in filtered_heroes.iterrows():
         with st.container(border=True):
             col_info, col_actions = st.columns([3, 1])
             
             with col_info:
                 st.markdown(f"### 🛡️ **{row['hero_name']}**")
                 st.markdown(f"**👥 Time:** {row['hero_team']}")
-                st.caption(f"🆔 ID: {row['id_hero']} | 📅 Criado: {row.get('start_date', 'N/A')}")
+                created = row['start_date'].strftime("%Y-%m-%d") if pd.notna(row['start_date']) else 'N/A'
+                st.caption(f"🆔 ID: {row['id_hero']} | 📅 Criado: {created}")
             
             with col_actions:
                 if st.button("✏️ Editar", key=f"edit_hero_{row['id_hero']}", use_container_width=True):
@@ -112,18 +115,21 @@ def show_filtered_heroes(df_herois):
                     st.rerun()
                 
                 if st.button("🗑️ Excluir", key=f"del_hero_{row['id_hero']}", type="secondary", use_container_width=True):
-                    handle_hero_deletion(index, row, df_herois)
+                    handle_hero_deletion(row)
 
-def handle_hero_update(hero_id, hero_name, hero_team, df_herois):
+def handle_hero_update(hero_id, hero_name, hero_team):
     """Gerencia atualização de herói"""
     if not hero_name.strip() or not hero_team.strip():
         st.error("Nome e Time são obrigatórios!")
     else:
         if show_loading_message("Atualizando herói..."):
-            df_herois.loc[df_herois['id_hero'] == hero_id, ['hero_name', 'hero_team', 'update_date']] = [
-                hero_name.strip(), hero_team.strip(), date.today().strftime("%Y-%m-%d")
-            ]
-            if save_data('hero', df_herois):
+            updates = {
+                'hero_name': hero_name.strip(),
+                'hero_team': hero_team.strip(),
+                'update_date': date.today().strftime("%Y-%m-%d")
+            }
+            if update_data('hero', [hero_id], updates):
+                refresh_hero(hero_id, updates['hero_name'], updates['hero_team'])
                 st.success("🎉 Herói atualizado com sucesso!")
                 logger.info(f"Herói {hero_id} atualizado: {hero_name}")
                 del st.session_state['hero_to_edit_id']
@@ -134,11 +140,11 @@ def handle_hero_creation(hero_name, hero_team, df_herois):
     """Gerencia criação de novo herói"""
     if not hero_name.strip() or not hero_team.strip():
         st.error("📝 Nome e Time são obrigatórios.")
-    elif hero_name.strip().lower() in df_herois['hero_name'].str.strip().str.lower().values:
+    elif normalize_name(hero_name) in get_hero_index()['by_normalized_name']:
         st.error(f"⚠️ O nome '{hero_name}' já existe.")
     else:
         if show_loading_message("Cadastrando herói..."):
-            new_id = (pd.to_numeric(df_herois['id_hero'], errors='coerce').max() + 1) if not df_herois.empty else 101
+            new_id = next_id('hero')
             today = date.today().strftime("%Y-%m-%d")
             new_row = {
                 'id_hero': str(new_id), 
@@ -147,19 +153,18 @@ def handle_hero_creation(hero_name, hero_team, df_herois):
                 'start_date': today, 
                 'update_date': today
             }
-            df_updated = pd.concat([df_herois, pd.DataFrame([new_row])], ignore_index=True)
-            if save_data('hero', df_updated):
+            if append_data('hero', [new_row]):
                 st.success(f"🎉 Herói '{hero_name}' cadastrado com sucesso!")
                 logger.info(f"Novo herói cadastrado: {hero_name} (ID: {new_id})")
                 create_success_animation()
                 time.sleep(1)
                 st.rerun()
 
-def handle_hero_deletion(index, row, df_herois):
+def handle_hero_deletion(row):
     """Gerencia exclusão de herói"""
     if show_loading_message("Excluindo herói..."):
-        df_herois.drop(index, inplace=True)
-        if save_data('hero', df_herois):
+        if delete_data('hero', [row['id_hero']]):
+            remove_hero(row['id_hero'])
             st.success("🗑️ Herói excluído!")
             logger.info(f"Herói excluído: {row['hero_name']} (ID: {row['id_hero']})")
             time.sleep(1)
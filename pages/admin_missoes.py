@@ -1,9 +1,10 @@
 import streamlit as st
-import pandas as pd
 from datetime import date
 import time
 from utils.ui_components import create_custom_header, display_pillar_icon, show_loading_message, create_success_animation
-from utils.data_manager import load_data, save_data
+from utils.data_manager import load_data, append_data, update_data, delete_data, next_id
+from utils.indexes import get_mission_index
+from utils.recognition_view import refresh_mission, remove_mission
 from utils.config import logger
 
 def show_page():
@@ -26,7 +27,7 @@ def show_page():
 def show_edit_mission_form(df_map):
     """Formulário de edição de missão"""
     mission_id = st.session_state['mission_to_edit_id']
-    mission_data = df_map[df_map['id_mission'] == mission_id].iloc[0]
+    mission_data = get_mission_index()['by_id'][int(mission_id)]
     
     st.markdown(f"### ✏️ **Editando Missão: _{mission_data['mission_name']}_**")
     
@@ -36,7 +37,7 @@ def show_edit_mission_form(df_map):
         
         col1, col2 = st.columns(2)
         with col1:
-            gems = st.number_input("💎 Recompensa em GEMS", min_value=1, step=1, value=int(pd.to_numeric(mission_data['GemsAwarded'])))
+            gems = st.number_input("💎 Recompensa em GEMS", min_value=1, step=1, value=int(mission_data['GemsAwarded']))
         with col2:
             pillar = st.text_input("🏛️ Pilar Associado", value=mission_data['pillar'])
         
@@ -52,7 +53,7 @@ def show_edit_mission_form(df_map):
             st.rerun()
         
         if submitted:
-            handle_mission_update(mission_id, mission_name, mission_discribe, gems, pillar, df_map)
+            handle_mission_update(mission_id, mission_name, mission_discribe, gems, pillar)
 
 def show_add_mission_form(df_map):
     """Formulário de adição de nova missão"""
@@ -96,7 +97,7 @@ def show_missions_list(df_map):
 def show_mission_statistics(df_map):
     """Mostra estatísticas das missões"""
     total_missions = len(df_map)
-    total_gems = df_map['GemsAwarded'].astype(int).sum()
+    total_gems = int(df_map['GemsAwarded'].sum())
     avg_gems = int(total_gems / total_missions) if total_missions > 0 else 0
     unique_pillars = df_map['pillar'].nunique()
     
@@ -121,12 +122,12 @@ def show_filtered_missions(df_map):
         st.markdown(f"#### 🏛️ **{pilar}**")
         pilar_missions = filtered_missions[filtered_missions['pillar'] == pilar]
         
-        for index, row in pilar_missions.iterrows():
+        for _, row in pilar_missions.iterrows():
             with st.container(border=True):
                 col_info, col_actions = st.columns([3, 1])
                 
                 with col_info:
-                    gems = int(pd.to_numeric(row['GemsAwarded']))
+                    gems = int(row['GemsAwarded'])
                     pillar_icon = display_pillar_icon(pilar, "40px")
                     
                     st.markdown(f"""
@@ -149,21 +150,26 @@ def show_filtered_missions(df_map):
                         st.rerun()
                     
                     if st.button("🗑️ Excluir", key=f"del_mission_{row['id_mission']}", type="secondary", use_container_width=True):
-                        handle_mission_deletion(index, row, df_map)
+                        handle_mission_deletion(row)
         
         st.markdown("---")
 
-def handle_mission_update(mission_id, mission_name, mission_discribe, gems, pillar, df_map):
+def handle_mission_update(mission_id, mission_name, mission_discribe, gems, pillar):
     """Gerencia atualização de missão"""
     if not all([mission_name.strip(), mission_discribe.strip(), pillar.strip(), gems > 0]):
         st.error("📝 Todos os campos são obrigatórios.")
     else:
         if show_loading_message("Atualizando missão..."):
             today = date.today().strftime("%Y-%m-%d")
-            update_values = [mission_name.strip(), mission_discribe.strip(), gems, pillar.strip(), today]
-            update_cols = ['mission_name', 'mission_discribe', 'GemsAwarded', 'pillar', 'update_date']
-            df_map.loc[df_map['id_mission'] == mission_id, update_cols] = update_values
-            if save_data('map', df_map):
+            updates = {
+                'mission_name': mission_name.strip(),
+                'mission_discribe': mission_discribe.strip(),
+                'GemsAwarded': gems,
+                'pillar': pillar.strip(),
+                'update_date': today
+            }
+            if update_data('map', [mission_id], updates):
+                refresh_mission(mission_id, updates['mission_name'], gems, updates['pillar'])
                 st.success("🎉 Missão atualizada com sucesso!")
                 logger.info(f"Missão {mission_id} atualizada: {mission_name}")
                 del st.session_state['mission_to_edit_id']
@@ -177,7 +183,7 @@ def handle_mission_creation(mission_name, mission_discribe, gems, pillar, df_map
     else:
         if show_loading_message("Cadastrando missão..."):
             today = date.today().strftime("%Y-%m-%d")
-            new_id_mission = (pd.to_numeric(df_map['id_mission'], errors='coerce').max() + 1) if not df_map.empty else 1
+            new_id_mission = next_id('map')
             id_pillar = hash(pillar.strip().lower()) % 1000
             new_data = {
                 'id_mission': new_id_mission, 
@@ -189,19 +195,18 @@ def handle_mission_creation(mission_name, mission_discribe, gems, pillar, df_map
                 'start_date': today, 
                 'update_date': today
             }
-            df_updated = pd.concat([df_map, pd.DataFrame([new_data])], ignore_index=True)
-            if save_data('map', df_updated):
+            if append_data('map', [new_data]):
                 st.success(f"🎉 Missão '{mission_name}' cadastrada com sucesso!")
                 logger.info(f"Nova missão cadastrada: {mission_name} (ID: {new_id_mission})")
                 create_success_animation()
                 time.sleep(1)
                 st.rerun()
 
-def handle_mission_deletion(index, row, df_map):
+def handle_mission_deletion(row):
     """Gerencia exclusão de missão"""
     if show_loading_message("Excluindo missão..."):
-        df_map.drop(index, inplace=True)
-        if save_data('map', df_map):
+        if delete_data('map', [row['id_mission']]):
+            remove_mission(row['id_mission'])
             st.success("🗑️ Missão excluída!")
             logger.info(f"Missão excluída: {row['mission_name']} (ID: {row['id_mission']})")
             time.sleep(1)
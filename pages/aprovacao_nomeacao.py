@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
-from pathlib import Path
 import time
 from utils.ui_components import create_custom_header, display_pillar_icon, show_loading_message
-from utils.data_manager import load_data, save_data
+from utils.data_manager import load_data, update_data
+from utils.recognition_view import refresh_nomination_status
+from utils.attachments import attachment_path, attachment_name, get_preview_path
 from utils.config import logger
 
 def show_page():
@@ -25,13 +26,16 @@ def show_page():
     # Enriquecer dados
     df_enriched = enrich_nomination_data(df_nomeacoes, df_herois, df_missoes)
     
+    # Contagens por status calculadas uma única vez para métricas e tabs
+    counts = count_by_status(df_enriched)
+    
     # Métricas rápidas
-    show_quick_metrics(df_enriched)
+    show_quick_metrics(len(df_enriched), counts)
     
     st.divider()
     
     # Tabs por status
-    create_status_tabs(df_enriched, df_nomeacoes)
+    create_status_tabs(df_enriched, counts)
 
 def enrich_nomination_data(df_nomeacoes, df_herois, df_missoes):
     """Enriquece dados das nomeações com nomes de heróis e missões"""
@@ -49,37 +53,34 @@ def enrich_nomination_data(df_nomeacoes, df_herois, df_missoes):
         how='left'
     )
     df_enriched['mission_name'] = df_enriched['mission_name'].fillna("?")
-    df_enriched['pillar'] = df_enriched['pillar'].fillna("?")
+    df_enriched['pillar'] = df_enriched['pillar'].astype(object).fillna("?")
+    df_enriched['status_norm'] = df_enriched['status'].astype(str).str.strip().str.lower()
     
     return df_enriched
 
-def show_quick_metrics(df_enriched):
+def count_by_status(df_enriched):
+    """Conta as nomeações por status normalizado"""
+    counts = df_enriched['status_norm'].value_counts()
+    return {status: int(counts.get(status, 0)) for status in ('pendente', 'aprovado', 'reprovado')}
+
+def show_quick_metrics(total_nomeacoes, counts):
     """Exibe métricas rápidas"""
-    total_nomeacoes = len(df_enriched)
-    pendentes = len(df_enriched[df_enriched['status'].str.strip().str.lower() == 'pendente'])
-    aprovadas = len(df_enriched[df_enriched['status'].str.strip().str.lower() == 'aprovado'])
-    reprovadas = len(df_enriched[df_enriched['status'].str.strip().str.lower() == 'reprovado'])
-    
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("📝 Total", total_nomeacoes)
-    col2.metric("⏳ Pendentes", pendentes)
-    col3.metric("✅ Aprovadas", aprovadas)
-    col4.metric("❌ Reprovadas", reprovadas)
+    col2.metric("⏳ Pendentes", counts['pendente'])
+    col3.metric("✅ Aprovadas", counts['aprovado'])
+    col4.metric("❌ Reprovadas", counts['reprovado'])
 
-def create_status_tabs(df_enriched, df_nomeacoes):
+def create_status_tabs(df_enriched, counts):
     """Cria tabs organizadas por status"""
-    pendentes = len(df_enriched[df_enriched['status'].str.strip().str.lower() == 'pendente'])
-    aprovadas = len(df_enriched[df_enriched['status'].str.strip().str.lower() == 'aprovado'])
-    reprovadas = len(df_enriched[df_enriched['status'].str.strip().str.lower() == 'reprovado'])
-    
     tab_pend, tab_aprov, tab_reprov = st.tabs([
-        f"⏳ Pendentes ({pendentes})", 
-        f"✅ Aprovadas ({aprovadas})", 
-        f"❌ Reprovadas ({reprovadas})"
+        f"⏳ Pendentes ({counts['pendente']})", 
+        f"✅ Aprovadas ({counts['aprovado']})", 
+        f"❌ Reprovadas ({counts['reprovado']})"
     ])
     
     with tab_pend:
-        show_pending_nominations(df_enriched, df_nomeacoes)
+        show_pending_nominations(df_enriched)
     
     with tab_aprov:
         show_approved_nominations(df_enriched)
@@ -87,25 +88,29 @@ def create_status_tabs(df_enriched, df_nomeacoes):
     with tab_reprov:
         show_rejected_nominations(df_enriched)
 
-def show_pending_nominations(df_enriched, df_nomeacoes):
+def show_pending_nominations(df_enriched):
     """Mostra nomeações pendentes com ações"""
-    pendentes_df = df_enriched[df_enriched['status'].str.strip().str.lower() == 'pendente']
+    pendentes_df = df_enriched[df_enriched['status_norm'] == 'pendente']
     
     if pendentes_df.empty:
         st.success("✨ Não há nomeações pendentes para avaliação.")
+    elif st.toggle("📦 Modo em lote", key="bulk_mode", help="Selecione várias nomeações e aprove ou reprove todas de uma vez"):
+        show_bulk_actions(pendentes_df)
     else:
-        for _, row in pendentes_df.iterrows():
+        # Apenas a página visível é renderizada
+        for _, row in paginate_pending(pendentes_df).iterrows():
             with st.container(border=True):
                 col_info, col_actions = st.columns([3, 1])
                 
                 with col_info:
                     pillar_icon = display_pillar_icon(row['pillar'], "30px")
+                    data_submissao = f"{row['data_submissao']:%Y-%m-%d}" if pd.notna(row['data_submissao']) else "sem data"
                     st.markdown(f"""
                     <div style="display: flex; align-items: center; gap: 0.75rem; margin-bottom: 0.5rem;">
                         {pillar_icon}
                         <div>
                             <strong>De:</strong> {row['nomeador']} <strong>→ Para:</strong> {row['nomeado']}<br>
-                            <small style="color: var(--text-secondary);">🎯 {row['mission_name']} | 📅 {row['data_submissao']}</small>
+                            <small style="color: var(--text-secondary);">🎯 {row['mission_name']} | 📅 {data_submissao}</small>
                         </div>
                     </div>
                     """, unsafe_allow_html=True)
@@ -113,26 +118,124 @@ def show_pending_nominations(df_enriched, df_nomeacoes):
                     with st.expander("📋 Ver Detalhes Completos"):
                         st.info(f"**Justificativa:**\n{row['justificativa']}")
                         
-                        if pd.notna(row['caminho_anexo']) and Path(row['caminho_anexo']).exists():
-                            with open(row['caminho_anexo'], "rb") as file:
-                                st.download_button(
-                                    f"📎 Baixar: {Path(row['caminho_anexo']).name}", 
-                                    file, 
-                                    Path(row['caminho_anexo']).name
-                                )
+                        show_attachment_preview(row)
+                        show_attachment_download(row)
                 
                 with col_actions:
                     id_nom = row['id_nomeacao']
                     
                     if st.button("✅ Aprovar", key=f"aprovar_{id_nom}", use_container_width=True):
-                        handle_approval(id_nom, df_nomeacoes, 'Aprovado')
+                        handle_approval([id_nom], 'Aprovado')
                     
                     if st.button("❌ Reprovar", key=f"reprovar_{id_nom}", use_container_width=True, type="secondary"):
-                        handle_approval(id_nom, df_nomeacoes, 'Reprovado')
+                        handle_approval([id_nom], 'Reprovado')
+
+def show_attachment_preview(row):
+    """Miniatura do anexo gerada em segundo plano; o arquivo original não é lido"""
+    if pd.isna(row['caminho_anexo']):
+        return
+    preview = get_preview_path(row['caminho_anexo'])
+    if preview:
+        st.image(str(preview), caption=attachment_name(row['caminho_anexo']), width=240)
+    else:
+        st.caption("🖼️ Pré-visualização indisponível ou em preparo")
+
+def show_attachment_download(row):
+    """Botão de download do anexo; o arquivo só é lido depois que o admin pede o download"""
+    caminho_anexo = attachment_path(row['caminho_anexo'])
+    if not caminho_anexo:
+        return
+    
+    nome_anexo = attachment_name(row['caminho_anexo'])
+    ready_key = f"anexo_pronto_{row['id_nomeacao']}"
+    if not st.session_state.get(ready_key):
+        st.button(
+            f"📎 Preparar download: {nome_anexo} ({caminho_anexo.stat().st_size / 1024:.0f} KB)",
+            key=f"preparar_anexo_{row['id_nomeacao']}",
+            on_click=lambda: st.session_state.update({ready_key: True})
+        )
+        return
+    
+    # Depois do clique o conteúdo é liberado para não ser relido a cada rerun
+    st.download_button(
+        f"📎 Baixar: {nome_anexo}", 
+        caminho_anexo.read_bytes(), 
+        nome_anexo,
+        key=f"anexo_{row['id_nomeacao']}",
+        on_click=lambda: st.session_state.pop(ready_key, None)
+    )
+
+PENDING_SORT_OPTIONS = {
+    "📅 Mais recentes": (['data_submissao', 'id_nomeacao'], False),
+    "📅 Mais antigas": (['data_submissao', 'id_nomeacao'], True),
+    "🏛️ Pilar": (['pillar', 'data_submissao'], True),
+}
+
+def paginate_pending(pendentes_df):
+    """Controles de ordenação e paginação; retorna só as linhas da página atual"""
+    col_sort, col_size, col_page = st.columns([2, 1, 1])
+    with col_sort:
+        sort_label = st.selectbox("Ordenar por", list(PENDING_SORT_OPTIONS), key="pending_sort")
+    with col_size:
+        page_size = st.selectbox("Itens por página", [10, 25, 50], key="pending_page_size")
+    total_pages = max(1, -(-len(pendentes_df) // page_size))
+    # Mantém a página dentro do intervalo quando a fila diminui ou o tamanho muda
+    if st.session_state.get("pending_page", 1) > total_pages:
+        st.session_state.pending_page = total_pages
+    with col_page:
+        page = st.number_input(f"Página (de {total_pages})", min_value=1, max_value=total_pages, step=1, key="pending_page")
+    
+    sort_cols, ascending = PENDING_SORT_OPTIONS[sort_label]
+    start = (page - 1) * page_size
+    st.caption(f"Exibindo {start + 1}–{min(start + page_size, len(pendentes_df))} de {len(pendentes_df)} nomeações pendentes")
+    return pendentes_df.sort_values(sort_cols, ascending=ascending).iloc[start:start + page_size]
+
+def show_bulk_actions(pendentes_df):
+    """Seleção em lote de nomeações pendentes com filtros por pilar e missão"""
+    col_pillar, col_mission = st.columns(2)
+    with col_pillar:
+        pilares = st.multiselect("🏛️ Filtrar por Pilar", sorted(pendentes_df['pillar'].unique().tolist()), key="bulk_pillars")
+    if pilares:
+        pendentes_df = pendentes_df[pendentes_df['pillar'].isin(pilares)]
+    with col_mission:
+        missoes = st.multiselect("🎯 Filtrar por Missão", sorted(pendentes_df['mission_name'].unique().tolist()), key="bulk_missions")
+    if missoes:
+        pendentes_df = pendentes_df[pendentes_df['mission_name'].isin(missoes)]
+    
+    select_all = st.checkbox(f"Selecionar todas as {len(pendentes_df)} nomeações filtradas", key="bulk_select_all")
+    
+    editor_df = pendentes_df[['id_nomeacao', 'data_submissao', 'nomeador', 'nomeado', 'mission_name', 'pillar']].assign(
+        selecionar=select_all
+    )
+    edited = st.data_editor(
+        editor_df,
+        key=f"bulk_editor_{select_all}_{'|'.join(pilares)}_{'|'.join(missoes)}",
+        use_container_width=True,
+        hide_index=True,
+        disabled=['id_nomeacao', 'data_submissao', 'nomeador', 'nomeado', 'mission_name', 'pillar'],
+        column_order=['selecionar', 'data_submissao', 'nomeador', 'nomeado', 'mission_name', 'pillar'],
+        column_config={
+            'selecionar': st.column_config.CheckboxColumn("✔️"),
+            'data_submissao': st.column_config.DateColumn("📅 Data", format="YYYY-MM-DD"),
+            'nomeador': "🛡️ Nomeador",
+            'nomeado': "⭐ Nomeado",
+            'mission_name': "🎯 Missão",
+            'pillar': "🏛️ Pilar"
+        }
+    )
+    selected_ids = edited.loc[edited['selecionar'], 'id_nomeacao'].tolist()
+    
+    col_approve, col_reject = st.columns(2)
+    with col_approve:
+        if st.button(f"✅ Aprovar selecionadas ({len(selected_ids)})", key="bulk_aprovar", use_container_width=True, type="primary", disabled=not selected_ids):
+            handle_approval(selected_ids, 'Aprovado')
+    with col_reject:
+        if st.button(f"❌ Reprovar selecionadas ({len(selected_ids)})", key="bulk_reprovar", use_container_width=True, disabled=not selected_ids):
+            handle_approval(selected_ids, 'Reprovado')
 
 def show_approved_nominations(df_enriched):
     """Mostra nomeações aprovadas"""
-    aprovadas_df = df_enriched[df_enriched['status'].str.strip().str.lower() == 'aprovado']
+    aprovadas_df = df_enriched[df_enriched['status_norm'] == 'aprovado']
     if not aprovadas_df.empty:
         st.dataframe(
             aprovadas_df[['data_submissao', 'nomeador', 'nomeado', 'mission_name', 'pillar']].rename(columns={
@@ -143,12 +246,13 @@ def show_approved_nominations(df_enriched):
                 'pillar': '🏛️ Pilar'
             }),
             use_container_width=True,
-            hide_index=True
+            hide_index=True,
+            column_config={'📅 Data': st.column_config.DateColumn(format="YYYY-MM-DD")}
         )
 
 def show_rejected_nominations(df_enriched):
     """Mostra nomeações reprovadas"""
-    reprovadas_df = df_enriched[df_enriched['status'].str.strip().str.lower() == 'reprovado']
+    reprovadas_df = df_enriched[df_enriched['status_norm'] == 'reprovado']
     if not reprovadas_df.empty:
         st.dataframe(
             reprovadas_df[['data_submissao', 'nomeador', 'nomeado', 'mission_name', 'pillar']].rename(columns={
@@ -159,15 +263,19 @@ def show_rejected_nominations(df_enriched):
                 'pillar': '🏛️ Pilar'
             }),
             use_container_width=True,
-            hide_index=True
+            hide_index=True,
+            column_config={'📅 Data': st.column_config.DateColumn(format="YYYY-MM-DD")}
         )
 
-def handle_approval(id_nom, df_nomeacoes, new_status):
-    """Gerencia aprovação/reprovação de nomeações"""
+def handle_approval(ids, new_status):
+    """Gerencia aprovação/reprovação de uma ou várias nomeações em uma única escrita"""
     with st.spinner(f"{'Aprovando' if new_status == 'Aprovado' else 'Reprovando'}..."):
-        df_nomeacoes.loc[df_nomeacoes['id_nomeacao'] == id_nom, 'status'] = new_status
-        if save_data('nomination', df_nomeacoes): 
-            st.success(f"Nomeação {'aprovada' if new_status == 'Aprovado' else 'reprovada'}!")
-            logger.info(f"Nomeação {id_nom} {new_status.lower()}")
+        if update_data('nomination', ids, {'status': new_status}):
+            refresh_nomination_status(ids, new_status)
+            if len(ids) == 1:
+                st.success(f"Nomeação {'aprovada' if new_status == 'Aprovado' else 'reprovada'}!")
+            else:
+                st.success(f"{len(ids)} nomeações {'aprovadas' if new_status == 'Aprovado' else 'reprovadas'}!")
+            logger.info(f"Nomeações {ids} {new_status.lower()}s")
             time.sleep(1)
             st.rerun()
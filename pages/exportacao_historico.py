@@ -0,0 +1,101 @@
+import streamlit as st
+import time
+import uuid
+from datetime import date
+from pathlib import Path
+from utils.ui_components import create_custom_header
+from utils.exports import EXPORT_FORMATS, HISTORY_STATUSES, export_history
+from utils.config import EXPORTS_PATH, logger
+
+# Exportações mais antigas que isso são removidas na próxima geração
+EXPORT_MAX_AGE_SECONDS = 24 * 3600
+
+def show_page():
+    """Exibe a página de exportação do histórico de nomeações"""
+    create_custom_header(
+        "Exportação de Histórico",
+        "Histórico completo das nomeações para auditoria",
+        "📤"
+    )
+    
+    with st.form("history_export_form"):
+        col_dates, col_status, col_format = st.columns([2, 2, 1])
+        with col_dates:
+            date_range = st.date_input("📅 Período (opcional)", (), key="history_export_dates")
+        with col_status:
+            statuses = st.multiselect("📌 Status", HISTORY_STATUSES, default=HISTORY_STATUSES, key="history_export_status")
+        with col_format:
+            label = st.selectbox("Formato", list(EXPORT_FORMATS), key="history_export_format")
+        submitted = st.form_submit_button("📤 Gerar exportação", use_container_width=True, type="primary")
+    
+    if submitted:
+        if not statuses:
+            st.warning("Selecione ao menos um status.")
+        else:
+            generate_export(date_range if len(date_range) == 2 else None, statuses, EXPORT_FORMATS[label])
+    
+    show_export_download()
+
+def generate_export(date_range, statuses, export_format):
+    """Grava o histórico em um arquivo temporário, bloco a bloco, mostrando o progresso"""
+    EXPORTS_PATH.mkdir(parents=True, exist_ok=True)
+    cleanup_exports()
+    
+    path = EXPORTS_PATH / f"historico_{uuid.uuid4().hex}.{export_format['ext']}"
+    progress = st.empty()
+    try:
+        total = export_history(
+            path, export_format["ext"], date_range, statuses,
+            progress=lambda rows: progress.caption(f"⏳ {rows} nomeações exportadas...")
+        )
+    except Exception as e:
+        path.unlink(missing_ok=True)
+        logger.error(f"Erro na exportação do histórico: {e}")
+        st.error(f"Erro ao exportar o histórico: {e}")
+        return
+    progress.empty()
+    
+    previous = st.session_state.get('history_export')
+    if previous:
+        Path(previous['path']).unlink(missing_ok=True)
+    st.session_state.history_export = {
+        'path': str(path),
+        'file_name': f"historico_nomeacoes_{date.today().strftime('%Y%m%d')}.{export_format['ext']}",
+        'mime': export_format["mime"],
+        'total': total
+    }
+    # O arquivo recém-gerado já fica pronto para o primeiro download
+    st.session_state.history_export_ready = True
+
+def show_export_download():
+    """Botão de download da última exportação gerada nesta sessão; o arquivo só é lido quando pedido"""
+    export = st.session_state.get('history_export')
+    if not export or not Path(export['path']).exists():
+        return
+    
+    st.success(f"✅ {export['total']} nomeações exportadas.")
+    if not st.session_state.get('history_export_ready'):
+        st.button(
+            f"📤 Preparar download: {export['file_name']} ({Path(export['path']).stat().st_size / 1024:.0f} KB)",
+            key="history_export_prepare",
+            use_container_width=True,
+            on_click=lambda: st.session_state.update(history_export_ready=True)
+        )
+        return
+    
+    # Depois do clique o conteúdo é liberado para não ser relido a cada rerun
+    st.download_button(
+        f"💾 Baixar {export['file_name']}",
+        Path(export['path']).read_bytes(),
+        export['file_name'],
+        mime=export['mime'],
+        use_container_width=True,
+        on_click=lambda: st.session_state.pop('history_export_ready', None)
+    )
+
+def cleanup_exports():
+    """Remove exportações antigas esquecidas por sessões encerradas"""
+    cutoff = time.time() - EXPORT_MAX_AGE_SECONDS
+    for old in EXPORTS_PATH.iterdir():
+        if old.stat().st_mtime < cutoff:
+            old.unlink(missing_ok=True)
@@ -1,5 +1,5 @@
 import streamlit as st
-from utils.ui_components import create_custom_header, get_cover_image
+from utils.ui_components import create_custom_header, get_cover_image, get_image_source
 from utils.config import APP_TITLE, APP_DESCRIPTION
 
 def show_page():
@@ -16,7 +16,8 @@ def show_page():
         # Exibir imagem da capa
         cover_path = get_cover_image()
         if cover_path:
-            st.image(cover_path, use_container_width=True, caption="Programa +GEMS")
+            # A coluna tem cerca de 480px no layout wide; a capa vai em WebP nesse tamanho (2x)
+            st.image(get_image_source(cover_path, width=480, fmt="WEBP"), use_container_width=True, caption="Programa +GEMS")
         else:
             st.markdown("### 💎 **Programa +GEMS**")
             st.info("📸 Adicione uma imagem 'Capa.png' na pasta assets/ para exibir aqui.")
@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from utils.ui_components import create_custom_header, get_pillar_image_path
+from utils.ui_components import create_custom_header, get_pillar_image_path, get_image_source
 from utils.data_manager import load_data
 from utils.config import logger
 
@@ -47,7 +47,7 @@ def show_kingdom_stats(df_map):
     # Calcular estatísticas
     total_pillars = df_map['pillar'].nunique()
     total_missions = len(df_map)
-    total_gems = df_map['GemsAwarded'].astype(str).str.extract('(\d+)', expand=False).astype(float).sum()
+    total_gems = df_map['GemsAwarded'].sum()
     avg_gems = total_gems / total_missions if total_missions > 0 else 0
     
     # Cards de estatísticas
@@ -102,7 +102,7 @@ def show_pillars_and_missions(df_map):
 def show_pillar_section(df_map, pilar):
     """Mostra seção de um pilar específico"""
     df_pilar = df_map[df_map['pillar'] == pilar]
-    total_gems_pilar = df_pilar['GemsAwarded'].astype(str).str.extract('(\d+)', expand=False).astype(float).sum()
+    total_gems_pilar = df_pilar['GemsAwarded'].sum()
     total_missoes = len(df_pilar)
     
     # Header do pilar
@@ -111,7 +111,7 @@ def show_pillar_section(df_map, pilar):
     with col_icon:
         image_path = get_pillar_image_path(pilar)
         if image_path:
-            st.image(image_path, width=100)
+            st.image(get_image_source(image_path, width=100), width=100)
         else:
             st.markdown('<div style="font-size: 3rem; text-align: center;">🏛️</div>', unsafe_allow_html=True)
     
@@ -153,9 +153,7 @@ def show_pillar_section(df_map, pilar):
 def show_missions_list(df_pilar):
     """Mostra lista de missões de forma simples"""
     # Ordenar por GEMS
-    df_pilar_sorted = df_pilar.copy()
-    df_pilar_sorted['GemsNum'] = df_pilar_sorted['GemsAwarded'].astype(str).str.extract('(\d+)', expand=False).astype(float)
-    df_pilar_sorted = df_pilar_sorted.sort_values('GemsNum', ascending=False)
+    df_pilar_sorted = df_pilar.sort_values('GemsAwarded', ascending=False)
     
     # Mostrar todas as missões
     for _, row in df_pilar_sorted.iterrows():
@@ -163,10 +161,7 @@ def show_missions_list(df_pilar):
 
 def show_mission_card(row):
     """Mostra card individual da missão simplificado"""
-    try:
-        gems = int(pd.to_numeric(str(row['GemsAwarded']).replace('GEMS', '').strip(), errors='coerce'))
-    except:
-        gems = 0
+    gems = int(row['GemsAwarded']) if pd.notna(row['GemsAwarded']) else 0
     
     st.markdown(f"""
     <div style="
@@ -1,11 +1,12 @@
 import streamlit as st
-import pandas as pd
 from datetime import date
 from pathlib import Path
 import time
 from utils.ui_components import create_custom_header, display_pillar_icon, show_loading_message, create_success_animation
-from utils.data_manager import load_data, save_data
-from utils.config import ANEXOS_DIR, logger
+from utils.data_manager import load_data, enqueue_rows, next_id
+from utils.indexes import get_hero_index, get_mission_index
+from utils.config import MAX_ATTACHMENT_MB, logger
+from utils.attachments import enqueue_with_attachment
 
 def show_page():
     """Exibe a página de nomeações"""
@@ -80,7 +81,7 @@ def select_mission(df_map):
             # Mostrar preview das missões disponíveis com ícones
             st.markdown("**💡 Missões disponíveis neste pilar:**")
             for _, mission_row in missoes_do_pilar.iterrows():
-                gems = int(pd.to_numeric(mission_row['GemsAwarded'], errors='coerce'))
+                gems = int(mission_row['GemsAwarded'])
                 pillar_icon = display_pillar_icon(pilar, "30px")
                 st.markdown(f"""
                 <div style="display: flex; align-items: center; gap: 0.5rem; margin: 0.25rem 0; padding: 0.5rem; background: var(--background-light); border-radius: 8px;">
@@ -114,16 +115,17 @@ def select_mission(df_map):
 
 def show_mission_reward(df_map, missao, pilar):
     """Mostra a recompensa da missão selecionada"""
-    mission_data = df_map[(df_map['mission_name'] == missao) & (df_map['pillar'] == pilar)]
-    if not mission_data.empty:
-        gems_reward = int(pd.to_numeric(mission_data['GemsAwarded'].iloc[0], errors='coerce'))
+    mission_id = get_mission_index()['by_pillar_and_name'].get((pilar, missao))
+    if mission_id is not None:
+        mission_data = get_mission_index()['by_id'][mission_id]
+        gems_reward = int(mission_data['GemsAwarded'])
         pillar_icon = display_pillar_icon(pilar, "40px")
         st.markdown(f"""
         <div style="display: flex; align-items: center; gap: 1rem; padding: 1rem; background: var(--success-color); color: white; border-radius: var(--border-radius); margin: 1rem 0;">
             {pillar_icon}
             <div>
                 <strong>💎 Recompensa desta missão: {gems_reward} GEMS</strong><br>
-                <small>{mission_data['mission_discribe'].iloc[0]}</small>
+                <small>{mission_data['mission_discribe']}</small>
             </div>
         </div>
         """, unsafe_allow_html=True)
@@ -141,7 +143,7 @@ def get_justification():
     
     anexo = st.file_uploader(
         "📎 Anexar Evidência (Opcional)", 
-        help="Anexe um print, documento ou qualquer arquivo que comprove o feito",
+        help=f"Anexe um print, documento ou qualquer arquivo que comprove o feito (até {MAX_ATTACHMENT_MB} MB)",
         type=['png', 'jpg', 'jpeg', 'pdf', 'docx', 'txt']
     )
     
@@ -153,6 +155,8 @@ def handle_submission(nomeador, nomeado, pilar, missao, justificativa, anexo, df
     validation_msgs = []
     if nomeador and nomeado and nomeador == nomeado:
         validation_msgs.append("⚠️ Um herói não pode nomear a si mesmo!")
+    if anexo and anexo.size > MAX_ATTACHMENT_MB * 1024 * 1024:
+        validation_msgs.append(f"⚠️ O anexo excede o limite de {MAX_ATTACHMENT_MB} MB!")
     
     if validation_msgs:
         for msg in validation_msgs:
@@ -175,22 +179,13 @@ def handle_submission(nomeador, nomeado, pilar, missao, justificativa, anexo, df
 def submit_nomination(nomeador, nomeado, pilar, missao, justificativa, anexo, df_herois, df_map):
     """Processa o envio da nomeação"""
     if show_loading_message("Registrando a nomeação..."):
-        df_nomeacoes = load_data('nomination')
-        novo_id = (pd.to_numeric(df_nomeacoes['id_nomeacao'], errors='coerce').max() + 1) if not df_nomeacoes.empty else 1
-        
-        # Salvar anexo se existir
-        caminho_anexo_salvo = None
-        if anexo:
-            nome_arquivo = f"{novo_id}_{anexo.name}"
-            caminho_anexo_salvo = ANEXOS_DIR / nome_arquivo
-            with open(caminho_anexo_salvo, "wb") as f: 
-                f.write(anexo.getbuffer())
-            logger.info(f"Anexo salvo: {caminho_anexo_salvo}")
+        novo_id = next_id('nomination')
         
         # Buscar IDs
-        id_nomeador = df_herois.loc[df_herois['hero_name'] == nomeador, 'id_hero'].iloc[0]
-        id_nomeado = df_herois.loc[df_herois['hero_name'] == nomeado, 'id_hero'].iloc[0]
-        id_missao = df_map.loc[df_map['mission_name'] == missao, 'id_mission'].iloc[0]
+        hero_ids = get_hero_index()['by_name']
+        id_nomeador = hero_ids[nomeador]
+        id_nomeado = hero_ids[nomeado]
+        id_missao = get_mission_index()['by_pillar_and_name'][(pilar, missao)]
         
         # Criar nova linha
         new_row = {
@@ -201,11 +196,11 @@ def submit_nomination(nomeador, nomeado, pilar, missao, justificativa, anexo, df
             'id_missao': id_missao,
             'justificativa': justificativa, 
             'status': 'Pendente', 
-            'caminho_anexo': str(caminho_anexo_salvo) if anexo else None
+            'caminho_anexo': None
         }
         
-        df_atualizado = pd.concat([df_nomeacoes, pd.DataFrame([new_row])], ignore_index=True)
-        if save_data('nomination', df_atualizado):
+        # Com anexo, ele é gravado antes; a nomeação só entra na fila (e é confirmada) se o anexo foi salvo
+        if enqueue_with_attachment('nomination', new_row, anexo, anexo.name) if anexo else enqueue_rows('nomination', [new_row]):
             st.success(f"🎉 Nomeação de **'{nomeado}'** enviada com sucesso!")
             logger.info(f"Nova nomeação criada: ID {novo_id}, Nomeador: {nomeador}, Nomeado: {nomeado}")
             create_success_animation()
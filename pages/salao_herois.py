@@ -1,10 +1,12 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from datetime import date
-from io import BytesIO
+from datetime import date, timedelta
 from utils.ui_components import create_custom_header, display_pillar_icon
-from utils.data_manager import get_dashboard_data
+from utils.recognition_view import get_dashboard_data, get_dashboard_aggregates, get_dashboard_filter_options, empty_dashboard_frame
+from utils.exports import EXPORT_FORMATS, export_dataframe
+from utils.dashboard_filters import FilterState, filter_frame
+from utils.config import DASHBOARD_CACHE_ENTRIES
 
 def show_page():
     """Exibe a página do Salão dos Heróis"""
@@ -14,27 +16,29 @@ def show_page():
         "⚔️"
     )
 
-    df = get_dashboard_data()
+    # Opções dos filtros calculadas uma vez por versão dos agregados
+    options = get_dashboard_filter_options()
 
-    if df.empty:
+    if options is None:
         st.warning("Ainda não há dados suficientes para exibir o dashboard. As nomeações precisam ser aprovadas primeiro.", icon="⚠️")
         return
 
     # Filtros aprimorados
-    create_filters_section(df)
+    create_filters_section(options)
 
-    # Aplicar filtros
-    filtered_df = apply_filters(df)
+    # Agregados por dia/herói/pilar, lidos só das partições do período selecionado
+    state = get_filter_state()
+    version, df_agg = get_dashboard_aggregates(state.date_range)
 
-    if filtered_df.empty:
+    # Filtros do formulário e dos gráficos, com os agregados derivados em cache compartilhado
+    view = get_dashboard_view(df_agg, version, state)
+
+    if view['filtered'].empty:
         st.warning("Nenhum dado encontrado para os filtros selecionados.")
         return
 
-    # Aplicar filtros interativos dos gráficos
-    filtered_df = apply_graph_filters(filtered_df)
-
     # KPIs aprimorados
-    show_metrics(filtered_df)
+    show_metrics(view['metrics'])
 
     st.divider()
 
@@ -42,25 +46,25 @@ def show_page():
     col_left, col_right = st.columns([1, 2], gap="large")
 
     with col_left:
-        show_recognition_feed(filtered_df)
-        show_pillar_distribution(filtered_df)
+        show_recognition_feed(options, view['metrics']['total_nominations'], state)
+        show_pillar_distribution(view['pillars'])
 
     with col_right:
-        show_hero_ranking(filtered_df)
+        show_hero_ranking(view['ranking'], view['pillar_columns'], version)
 
     # Seção de jornada das nomeações
     st.divider()
-    show_nomination_journey(filtered_df)
+    show_nomination_journey(view['daily'])
 
-def create_filters_section(df):
-    """Cria a seção de filtros"""
+def create_filters_section(options):
+    """Cria a seção de filtros a partir das opções disponíveis nos agregados"""
     with st.expander("🔍 **Filtros do Reino**", expanded=True):
         with st.container(border=True):
             col1, col2, col3, col4 = st.columns(4)
 
             with col1:
-                min_date = df['data_submissao'].min().date()
-                max_date = df['data_submissao'].max().date()
+                min_date = options['min_date']
+                max_date = options['max_date']
                 date_range = st.date_input(
                     "📅 Período",
                     (min_date, max_date),
@@ -71,7 +75,7 @@ def create_filters_section(df):
                 st.session_state.date_range = date_range
 
             with col2:
-                all_heroes = sorted(df['Herói'].unique())
+                all_heroes = options['heroes']
                 selected_heroes = st.multiselect(
                     "🛡️ Heróis", 
                     all_heroes, 
@@ -81,7 +85,7 @@ def create_filters_section(df):
                 st.session_state.selected_heroes = selected_heroes
 
             with col3:
-                all_pillars = sorted(df['pillar'].unique())
+                all_pillars = options['pillars']
                 selected_pillars = st.multiselect(
                     "🏛️ Pilares", 
                     all_pillars, 
@@ -91,7 +95,7 @@ def create_filters_section(df):
                 st.session_state.selected_pillars = selected_pillars
 
             with col4:
-                all_teams = sorted(df['Time'].unique())
+                all_teams = options['teams']
                 selected_teams = st.multiselect(
                     "👥 Times", 
                     all_teams, 
@@ -100,55 +104,60 @@ def create_filters_section(df):
                 )
                 st.session_state.selected_teams = selected_teams
 
-def apply_filters(df):
-    """Aplica os filtros selecionados"""
-    try:
-        date_range = st.session_state.get('date_range', (df['data_submissao'].min().date(), df['data_submissao'].max().date()))
-        selected_heroes = st.session_state.get('selected_heroes', df['Herói'].unique().tolist())
-        selected_pillars = st.session_state.get('selected_pillars', df['pillar'].unique().tolist())
-        selected_teams = st.session_state.get('selected_teams', df['Time'].unique().tolist())
-
-        if isinstance(date_range, tuple) and len(date_range) == 2:
-            start_date, end_date = date_range
-            filtered_df = df[
-                (df['data_submissao'].dt.date >= start_date) &
-                (df['data_submissao'].dt.date <= end_date) &
-                (df['Herói'].isin(selected_heroes)) &
-                (df['pillar'].isin(selected_pillars)) &
-                (df['Time'].isin(selected_teams))
-            ]
-            return filtered_df
-        else:
-            return df
-    except Exception as e:
-        st.error("Erro ao aplicar filtros. Usando dados completos.")
-        return df
-
-def apply_graph_filters(filtered_df):
-    """Aplica filtros baseados em interações nos gráficos"""
-    # Filtro do gráfico de pilares
-    if "pillar_chart_selection" in st.session_state and st.session_state.pillar_chart_selection.get("points"):
-        selected_points = st.session_state.pillar_chart_selection["points"]
-        if selected_points:
-            selected_pillar = selected_points[0]["label"]
-            filtered_df = filtered_df[filtered_df['pillar'] == selected_pillar]
-
-    # Filtro do gráfico diário
-    if "daily_chart_selection" in st.session_state and st.session_state.daily_chart_selection.get("points"):
-        selected_points = st.session_state.daily_chart_selection["points"]
-        if selected_points:
-            selected_date = pd.to_datetime(selected_points[0]["x"]).date()
-            filtered_df = filtered_df[filtered_df['data_submissao'].dt.date == selected_date]
-
-    return filtered_df
-
-def show_metrics(filtered_df):
-    """Exibe métricas do reino"""
+def get_selected_date_range():
+    """Período completo (início, fim) selecionado no filtro, ou None"""
+    date_range = st.session_state.get('date_range')
+    if isinstance(date_range, tuple) and len(date_range) == 2:
+        return date_range
+    return None
+
+def apply_filters(df, file_key, version, date_range=None):
+    """Aplica os filtros do formulário e dos gráficos com o motor vetorizado"""
+    return filter_frame(df, file_key, version, get_filter_state(), date_range)
+
+@st.cache_resource(max_entries=DASHBOARD_CACHE_ENTRIES)
+def _cached_dashboard_view(_df_agg, version, state):
+    """Resultado filtrado e agregados derivados, compartilhados entre sessões (somente leitura)"""
+    # _df_agg foi lido só no período state.date_range
+    filtered_agg = filter_frame(_df_agg, 'recognition_daily', version, state, state.date_range)
+    if filtered_agg.empty:
+        return {'filtered': filtered_agg}
+    final_ranking, pillar_columns = compute_hero_ranking(filtered_agg)
+    return {
+        'filtered': filtered_agg,
+        'metrics': compute_metrics(filtered_agg),
+        'pillars': filtered_agg.groupby('pillar', observed=True)['GemsAwarded'].sum().sort_values(ascending=False).reset_index(),
+        'ranking': final_ranking,
+        'pillar_columns': pillar_columns,
+        # Os agregados já estão no grão diário
+        'daily': filtered_agg.groupby('data_submissao')['GemsAwarded'].sum().reset_index().rename(columns={'data_submissao': 'date'}),
+    }
+
+def get_dashboard_view(df_agg, version, state):
+    """Visão do dashboard para o estado dos filtros; o cache LRU é chaveado por (versão com que df_agg foi lido, filtros).
+
+    df_agg deve ter sido lido no período state.date_range, que faz parte da chave.
+    """
+    return _cached_dashboard_view(df_agg, version, state)
+
+def compute_metrics(filtered_agg):
+    """Métricas do reino a partir dos agregados filtrados"""
+    total_heroes = filtered_agg['Herói'].nunique()
+    total_gems = int(filtered_agg['GemsAwarded'].sum())
+    return {
+        'total_heroes': total_heroes,
+        'total_gems': total_gems,
+        'avg_gems': int(total_gems / total_heroes) if total_heroes > 0 else 0,
+        'total_nominations': int(filtered_agg['nominations'].sum()),
+    }
+
+def show_metrics(metrics):
+    """Exibe métricas do reino a partir dos agregados"""
     st.markdown("### 📊 **Métricas do Reino**")
-    total_heroes = filtered_df['Herói'].nunique()
-    total_gems = int(filtered_df['GemsAwarded'].sum())
-    avg_gems = int(total_gems / total_heroes) if total_heroes > 0 else 0
-    total_nominations = len(filtered_df)
+    total_heroes = metrics['total_heroes']
+    total_gems = metrics['total_gems']
+    avg_gems = metrics['avg_gems']
+    total_nominations = metrics['total_nominations']
 
     kpi1, kpi2, kpi3, kpi4 = st.columns(4)
 
@@ -164,29 +173,66 @@ def show_metrics(filtered_df):
     with kpi4:
         st.metric("📜 Nomeações Aprovadas", f"{total_nominations:,}".replace(",", "."))
 
-def show_recognition_feed(filtered_df):
+FEED_PAGE_SIZE = 20
+
+def load_more_feed():
+    """Amplia a janela do feed em mais uma página"""
+    st.session_state.feed_limit = st.session_state.get('feed_limit', FEED_PAGE_SIZE) + FEED_PAGE_SIZE
+
+def load_feed_window(date_range, limit):
+    """Lê a visão mês a mês, do mais recente para o mais antigo, até reunir `limit` reconhecimentos filtrados"""
+    start, end = date_range
+    frames, found = [], 0
+    window_end = end
+    while window_end >= start and found < limit:
+        window_start = max(start, window_end.replace(day=1))
+        # Cada janela mensal lê apenas a partição correspondente e fica em cache
+        version, df_window = get_dashboard_data((window_start, window_end))
+        chunk = apply_filters(df_window, 'recognition', version, (window_start, window_end))
+        if not chunk.empty:
+            frames.append(chunk)
+            found += len(chunk)
+        window_end = window_start - timedelta(days=1)
+    if not frames:
+        return empty_dashboard_frame()
+    return pd.concat(frames, ignore_index=True).nlargest(limit, 'data_submissao')
+
+def show_recognition_feed(options, total, state):
     """Exibe feed de reconhecimento com imagens dos pilares"""
     st.markdown("### 📜 **Feed de Reconhecimento**")
-    with st.container(height=400, border=True):
-        feed_data = filtered_df.sort_values('data_submissao', ascending=False)
+    # Filtros novos começam de novo na primeira página
+    if st.session_state.get('feed_filter_state') != state:
+        st.session_state.feed_filter_state = state
+        st.session_state.feed_limit = FEED_PAGE_SIZE
+    limit = st.session_state.feed_limit
+    # O total vem dos agregados; só a janela mais recente é lida e renderizada
+    date_range = state.date_range or (options['min_date'], options['max_date'])
+    feed_data = load_feed_window(date_range, limit)
 
-        for _, row in feed_data.iterrows():
-            pillar_icon = display_pillar_icon(row['pillar'])
-            st.markdown(f"""
+    with st.container(height=400, border=True):
+        feed_items = [f"""
             <div class="feed-item" style="padding: 10px; border-bottom: 1px solid var(--border-color); display: flex; align-items: center; gap: 10px;">
-                {pillar_icon}
+                {display_pillar_icon(row['pillar'])}
                 <div>
                     <strong>{row['Herói']}</strong> foi reconhecido(a) por <strong>{row['Nomeador']}</strong><br>
                     <small style="color: var(--text-secondary);">🎯 {row['mission_name']}</small><br>
                     <small style="color: var(--text-secondary);">📅 {row['data_submissao'].strftime('%d/%m/%Y')}</small>
                 </div>
             </div>
-            """, unsafe_allow_html=True)
+            """ for _, row in feed_data.iterrows()]
+        st.markdown("".join(feed_items), unsafe_allow_html=True)
+
+    if total > limit:
+        st.button(
+            f"⬇️ Carregar mais ({total - limit} restantes)",
+            on_click=load_more_feed,
+            use_container_width=True,
+            key="feed_load_more"
+        )
 
-def show_pillar_distribution(filtered_df):
+def show_pillar_distribution(pillar_data):
     """Exibe distribuição dos pilares"""
     st.markdown("### 🏛️ **Pilares da Jornada**")
-    pillar_data = filtered_df.groupby('pillar')['GemsAwarded'].sum().sort_values(ascending=False).reset_index()
 
     if not pillar_data.empty:
         colors = px.colors.qualitative.Pastel  # Usando uma paleta mais suave para melhor UX
@@ -212,12 +258,11 @@ def show_pillar_distribution(filtered_df):
     else:
         st.info("Nenhum dado disponível para distribuição de pilares.")
 
-def show_hero_ranking(filtered_df):
-    """Exibe ranking dos heróis"""
-    st.markdown("### 🏆 **Ranking dos Heróis**")
+def compute_hero_ranking(filtered_agg):
+    """Ranking dos heróis com porcentagem, medalhas e cristais por pilar"""
     # Preparação dos dados para ranking
-    total_gems = filtered_df['GemsAwarded'].sum()
-    hero_ranking = filtered_df.groupby(['Herói', 'Time'])['GemsAwarded'].sum().reset_index()
+    total_gems = filtered_agg['GemsAwarded'].sum()
+    hero_ranking = filtered_agg.groupby(['Herói', 'Time'], observed=True)['GemsAwarded'].sum().reset_index()
     hero_ranking = hero_ranking[hero_ranking['GemsAwarded'] > 0]  # Mostrar apenas linhas com valores
     hero_ranking = hero_ranking.sort_values('GemsAwarded', ascending=False).reset_index(drop=True)
     hero_ranking.index = hero_ranking.index + 1
@@ -239,14 +284,23 @@ def show_hero_ranking(filtered_df):
     hero_ranking['Posição'] = hero_ranking.index.map(add_medals)
 
     # Pivot para pilares
-    pivot_pillars = filtered_df.pivot_table(
+    pivot_pillars = filtered_agg.pivot_table(
         index='Herói', 
         columns='pillar', 
         values='GemsAwarded', 
-        aggfunc='sum'
+        aggfunc='sum',
+        observed=True
     ).fillna(0).astype(int)
 
-    final_ranking = hero_ranking.merge(pivot_pillars, on='Herói', how='left').fillna(0)
+    final_ranking = hero_ranking.merge(pivot_pillars, on='Herói', how='left').fillna({col: 0 for col in pivot_pillars.columns})
+
+    # Colunas de pilares apenas se houver valores
+    pillar_columns = [col for col in pivot_pillars.columns if final_ranking[col].sum() > 0]
+    return final_ranking, pillar_columns
+
+def show_hero_ranking(final_ranking, pillar_columns, version):
+    """Exibe ranking dos heróis"""
+    st.markdown("### 🏆 **Ranking dos Heróis**")
 
     # Configuração da tabela aprimorada
     column_config = {
@@ -267,8 +321,7 @@ def show_hero_ranking(filtered_df):
         ),
     }
 
-    # Adicionar configuração para colunas de pilares apenas se houver valores
-    pillar_columns = [col for col in pivot_pillars.columns if final_ranking[col].sum() > 0]
+    # Adicionar configuração para colunas de pilares
     for col in pillar_columns:
         column_config[col] = st.column_config.NumberColumn(
             f"🏛️ {col}",
@@ -284,24 +337,59 @@ def show_hero_ranking(filtered_df):
         hide_index=True
     )
 
-    # Botão de exportação para Excel
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-        final_ranking.to_excel(writer, sheet_name='Ranking', index=False)
-    st.download_button(
-        label="📥 Exportar para Excel",
-        data=buffer.getvalue(),
-        file_name=f"ranking_herois_{date.today().strftime('%Y%m%d')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        use_container_width=True
+    show_ranking_export(final_ranking, version)
+
+def get_filter_state():
+    """Estado dos filtros (formulário e gráficos), hashable para chaves de cache"""
+    pillar_points = (st.session_state.get("pillar_chart_selection") or {}).get("points") or []
+    daily_points = (st.session_state.get("daily_chart_selection") or {}).get("points") or []
+    def selected(key):
+        return tuple(st.session_state[key]) if key in st.session_state else None
+
+    return FilterState(
+        date_range=get_selected_date_range(),
+        heroes=selected('selected_heroes'),
+        pillars=selected('selected_pillars'),
+        teams=selected('selected_teams'),
+        chart_pillar=pillar_points[0]["label"] if pillar_points else None,
+        chart_day=pd.to_datetime(daily_points[0]["x"]).date() if daily_points else None,
     )
 
-def show_nomination_journey(filtered_df):
+@st.cache_data(max_entries=32)
+def build_ranking_export(_final_ranking, version, filter_state, ext):
+    """Arquivo do ranking no formato pedido, em cache por (versão dos dados, filtros, formato)"""
+    return export_dataframe(_final_ranking, ext, sheet_name='Ranking')
+
+def show_ranking_export(final_ranking, version):
+    """Exportação do ranking gerada só quando pedida"""
+    col_format, col_action = st.columns([1, 1])
+    with col_format:
+        label = st.selectbox("Formato", list(EXPORT_FORMATS), key="ranking_export_format", label_visibility="collapsed")
+    export_format = EXPORT_FORMATS[label]
+    
+    with col_action:
+        if not st.session_state.get("ranking_export_ready"):
+            st.button(
+                "📥 Exportar ranking",
+                key="ranking_export_prepare",
+                use_container_width=True,
+                on_click=lambda: st.session_state.update(ranking_export_ready=True)
+            )
+            return
+        
+        data = build_ranking_export(final_ranking, version, get_filter_state(), export_format["ext"])
+        st.download_button(
+            label=f"💾 Baixar {label}",
+            data=data,
+            file_name=f"ranking_herois_{date.today().strftime('%Y%m%d')}.{export_format['ext']}",
+            mime=export_format["mime"],
+            use_container_width=True,
+            on_click=lambda: st.session_state.pop("ranking_export_ready", None)
+        )
+
+def show_nomination_journey(daily_gems):
     """Exibe a jornada das nomeações com cristais por dia"""
     st.markdown("### 📈 **Jornada das Nomeações**")
-    filtered_df['date'] = filtered_df['data_submissao'].dt.date
-    daily_gems = filtered_df.groupby('date')['GemsAwarded'].sum().reset_index()
-    daily_gems['date'] = pd.to_datetime(daily_gems['date'])  # Garantir que seja datetime para eixo X
 
     fig_daily = px.line(
         daily_gems, 
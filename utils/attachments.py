@@ -0,0 +1,290 @@
+import streamlit as st
+import argparse
+import hashlib
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from PIL import Image
+from .config import ANEXOS_DIR, MAX_ATTACHMENT_MB
+from .files import atomic_write
+from .data_manager import load_data, update_data, enqueue_rows, flush_writes
+
+logger = logging.getLogger(__name__)
+
+# Anexos são guardados uma única vez por conteúdo em anexos/blobs/<2 primeiros>/<sha256>;
+# a nomeação aponta para "sha256:<hash>/<nome original>"
+ATTACHMENT_PREFIX = "sha256:"
+BLOBS_DIR = ANEXOS_DIR / "blobs"
+# Pré-visualizações em PNG, uma por blob, em anexos/previews/<2 primeiros>/<sha256>.png
+PREVIEWS_DIR = ANEXOS_DIR / "previews"
+PREVIEW_SIZE = 320
+IMAGE_SUFFIXES = {'.png', '.jpg', '.jpeg'}
+# Blobs recentes não são coletados: a nomeação pode ainda estar na fila de escrita
+GC_GRACE_SECONDS = 3600
+MAX_ATTACHMENT_BYTES = MAX_ATTACHMENT_MB * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+_store_lock = threading.Lock()
+_preview_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gems-preview")
+# Pré-visualizações em geração ou sem suporte (hash -> Future ou None)
+_preview_jobs = {}
+_preview_lock = threading.Lock()
+
+def _blob_path(digest):
+    """Caminho do blob de um hash no armazenamento"""
+    return BLOBS_DIR / digest[:2] / digest
+
+def _preview_path(digest):
+    """Caminho da pré-visualização de um hash"""
+    return PREVIEWS_DIR / digest[:2] / f"{digest}.png"
+
+def _legacy_name(ref):
+    """Nome do arquivo de um caminho antigo (anexos/{id}_{nome}), aceitando separadores do Windows"""
+    return re.split(r"[\\/]", str(ref))[-1]
+
+def is_attachment_ref(ref):
+    """Indica se o valor já é uma referência ao armazenamento por conteúdo"""
+    return isinstance(ref, str) and ref.startswith(ATTACHMENT_PREFIX)
+
+def parse_attachment_ref(ref):
+    """Separa a referência em (hash, nome original)"""
+    digest, _, filename = ref[len(ATTACHMENT_PREFIX):].partition("/")
+    return digest, filename
+
+def store_attachment(fileobj, filename, max_bytes=MAX_ATTACHMENT_BYTES):
+    """Grava o anexo em blocos num arquivo temporário e o move pelo hash (sem regravar conteúdo já conhecido).
+
+    O UploadedFile do Streamlit já está inteiro em memória; a cópia em blocos apenas evita uma segunda cópia
+    completa do conteúdo (como getvalue() faria) e lê arquivos em disco sem carregá-los de uma vez.
+    """
+    tmp_dir = BLOBS_DIR / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    digest, size = hashlib.sha256(), 0
+    with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+        tmp_path = Path(tmp.name)
+        try:
+            while chunk := fileobj.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"Anexo {filename} excede o limite de {max_bytes // (1024 * 1024)} MB")
+                digest.update(chunk)
+                tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    digest = digest.hexdigest()
+    blob = _blob_path(digest)
+    with _store_lock:
+        if blob.exists():
+            tmp_path.unlink(missing_ok=True)
+            # Renova o prazo de carência da coleta de lixo
+            os.utime(blob)
+            logger.info(f"Anexo {filename} já armazenado ({digest[:12]}); escrita ignorada")
+        else:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, blob)
+            logger.info(f"Anexo {filename} armazenado como {digest[:12]} ({size} bytes)")
+    return f"{ATTACHMENT_PREFIX}{digest}/{Path(filename).name}"
+
+def enqueue_with_attachment(file_key, row, fileobj, filename):
+    """Grava o anexo e só então enfileira o registro com a referência; se o anexo falhar, nada é enfileirado"""
+    fileobj.seek(0)
+    try:
+        ref = store_attachment(fileobj, filename)
+    except Exception as e:
+        logger.error(f"Falha ao gravar o anexo {filename} do registro {row}: {e}")
+        st.error(f"Falha ao gravar o anexo {filename}: {e}")
+        return False
+    if not enqueue_rows(file_key, [{**row, 'caminho_anexo': ref}]):
+        return False
+    schedule_preview(ref)
+    return True
+
+def _render_preview(blob, suffix, target):
+    """Gera a pré-visualização: imagens reduzidas pelo Pillow, PDFs pela 1ª página via pdftoppm"""
+    if suffix in IMAGE_SUFFIXES:
+        with Image.open(blob) as img, atomic_write(target) as tmp_path:
+            img.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE), Image.LANCZOS)
+            # CMYK e outros modos de JPEG não podem ser gravados em PNG
+            if img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+                img = img.convert('RGB')
+            img.save(tmp_path, "PNG", optimize=True)
+    elif suffix == '.pdf' and shutil.which("pdftoppm"):
+        with atomic_write(target) as tmp_path:
+            # O pdftoppm acrescenta a extensão .png ao nome pedido
+            subprocess.run(
+                ["pdftoppm", "-png", "-singlefile", "-f", "1", "-l", "1", "-scale-to", str(PREVIEW_SIZE), str(blob), str(tmp_path.with_suffix(''))],
+                check=True, capture_output=True, timeout=60
+            )
+    else:
+        return False
+    return True
+
+def _generate_preview(digest, filename):
+    """Tarefa do pool: gera a pré-visualização do blob, se o tipo do arquivo tiver suporte"""
+    target = _preview_path(digest)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if _render_preview(_blob_path(digest), Path(filename).suffix.lower(), target):
+            logger.info(f"Pré-visualização gerada para {filename} ({digest[:12]})")
+            with _preview_lock:
+                _preview_jobs.pop(digest, None)
+            return
+    except Exception as e:
+        logger.error(f"Erro ao gerar pré-visualização de {filename}: {e}")
+    # Sem suporte ou com erro: não tenta de novo neste processo
+    with _preview_lock:
+        _preview_jobs[digest] = None
+
+def schedule_preview(ref):
+    """Agenda a geração da pré-visualização do anexo no pool, se ainda não existir"""
+    if not is_attachment_ref(ref):
+        return
+    digest, filename = parse_attachment_ref(ref)
+    with _preview_lock:
+        if digest in _preview_jobs or _preview_path(digest).exists():
+            return
+        _preview_jobs[digest] = _preview_pool.submit(_generate_preview, digest, filename)
+
+def get_preview_path(ref):
+    """Pré-visualização já gerada do anexo; se faltar, agenda a geração e retorna None"""
+    if not is_attachment_ref(ref):
+        return None
+    path = _preview_path(parse_attachment_ref(ref)[0])
+    if path.exists():
+        return path
+    schedule_preview(ref)
+    return None
+
+def attachment_name(ref):
+    """Nome original do anexo para exibição e download"""
+    if is_attachment_ref(ref):
+        return parse_attachment_ref(ref)[1]
+    return _legacy_name(ref)
+
+def attachment_path(ref):
+    """Arquivo do anexo em disco, ou None se não existir"""
+    if not isinstance(ref, str) or not ref:
+        return None
+    if is_attachment_ref(ref):
+        path = _blob_path(parse_attachment_ref(ref)[0])
+    else:
+        path = Path(ref)
+        if not path.exists():
+            path = ANEXOS_DIR / _legacy_name(ref)
+    return path if path.is_file() else None
+
+def _file_digest(path):
+    """sha256 do arquivo, lido em blocos"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def migrate_legacy_attachments(remove_originals=False):
+    """Move os anexos antigos (um arquivo por nomeação) para o armazenamento por conteúdo; retorna quantos foram conferidos.
+
+    Os originais só são apagados com remove_originals e depois de conferidos o blob e a referência gravada;
+    originais mantidos por uma execução anterior são conferidos e removidos numa nova execução com a opção.
+    """
+    df = load_data('nomination', ['id_nomeacao', 'caminho_anexo']).dropna(subset=['caminho_anexo'])
+
+    # Arquivo original -> (nomeação, nova referência)
+    updates, originals = {}, {}
+    for id_nomeacao, ref in zip(df['id_nomeacao'], df['caminho_anexo'].astype(str)):
+        if is_attachment_ref(ref):
+            kept = ANEXOS_DIR / f"{id_nomeacao}_{parse_attachment_ref(ref)[1]}"
+            if kept.is_file():
+                originals[kept] = (int(id_nomeacao), ref)
+            continue
+        path = attachment_path(ref)
+        if path is None:
+            logger.warning(f"Anexo da nomeação {id_nomeacao} não encontrado: {ref}")
+            continue
+        # Remove o prefixo "{id}_" que o formato antigo acrescentava ao nome
+        filename = re.sub(rf"^{id_nomeacao}_", "", path.name)
+        with open(path, "rb") as f:
+            new_ref = store_attachment(f, filename, max_bytes=float('inf'))
+        updates.setdefault(new_ref, []).append(int(id_nomeacao))
+        originals[path] = (int(id_nomeacao), new_ref)
+
+    for new_ref, ids in updates.items():
+        if not update_data('nomination', ids, {'caminho_anexo': new_ref}):
+            return 0
+        schedule_preview(new_ref)
+
+    # Confere cada blob contra o original e a referência gravada antes de qualquer remoção
+    saved = load_data('nomination', ['id_nomeacao', 'caminho_anexo']).set_index('id_nomeacao')['caminho_anexo']
+    verified = []
+    for path, (id_nomeacao, new_ref) in originals.items():
+        digest = parse_attachment_ref(new_ref)[0]
+        blob = _blob_path(digest)
+        if saved.get(id_nomeacao) == new_ref and blob.is_file() and _file_digest(blob) == digest == _file_digest(path):
+            verified.append(path)
+    if len(verified) != len(originals):
+        logger.error(f"Migração de anexos: {len(originals) - len(verified)} arquivos não conferem; originais mantidos")
+    if remove_originals:
+        for path in verified:
+            path.unlink(missing_ok=True)
+    if originals:
+        logger.info(
+            f"Anexos antigos: {sum(len(ids) for ids in updates.values())} migrados, {len(verified)} de {len(originals)} conferidos, "
+            f"originais {'removidos' if remove_originals else 'mantidos'}"
+        )
+    return len(verified)
+
+def collect_garbage(grace_seconds=GC_GRACE_SECONDS):
+    """Remove blobs que nenhuma nomeação referencia mais; retorna quantos foram removidos"""
+    if not BLOBS_DIR.exists():
+        return 0
+    flush_writes()
+    refs = load_data('nomination', ['caminho_anexo'])['caminho_anexo'].dropna().astype(str)
+    referenced = {parse_attachment_ref(ref)[0] for ref in refs if is_attachment_ref(ref)}
+
+    removed = 0
+    cutoff = time.time() - grace_seconds
+    with _store_lock:
+        for blob in BLOBS_DIR.glob("*/*"):
+            # blobs/tmp guarda envios em andamento, ainda sem hash
+            if blob.parent == BLOBS_DIR / "tmp" or blob.name in referenced or blob.stat().st_mtime > cutoff:
+                continue
+            blob.unlink(missing_ok=True)
+            _preview_path(blob.name).unlink(missing_ok=True)
+            removed += 1
+    if removed:
+        logger.info(f"Coleta de anexos: {removed} blobs sem referência removidos")
+    return removed
+
+@st.cache_resource
+def ensure_attachment_store():
+    """Coleta blobs órfãos uma vez por processo; a migração de anexos antigos é feita pela linha de comando"""
+    try:
+        return collect_garbage()
+    except Exception as e:
+        logger.error(f"Erro na manutenção dos anexos: {e}")
+        return 0
+
+def main(argv=None):
+    """Linha de comando: python -m utils.attachments migrar [--remover-originais]"""
+    parser = argparse.ArgumentParser(description="Manutenção dos anexos das nomeações")
+    commands = parser.add_subparsers(dest="comando", required=True)
+    migrate = commands.add_parser("migrar", help="Move os anexos antigos (anexos/{id}_{nome}) para o armazenamento por conteúdo")
+    migrate.add_argument("--remover-originais", action="store_true", help="Apaga os arquivos antigos depois de conferidos")
+    args = parser.parse_args(argv)
+
+    migrated = migrate_legacy_attachments(remove_originals=args.remover_originais)
+    flush_writes()
+    print(f"{migrated} anexos antigos conferidos" + ("; originais removidos" if args.remover_originais else "; originais mantidos"))
+
+if __name__ == "__main__":
+    main()
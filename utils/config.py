@@ -12,6 +12,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_PATH = Path(os.getenv("DATA_PATH", str(BASE_DIR / "data")))
 ASSETS_PATH = Path(os.getenv("ASSETS_PATH", str(BASE_DIR / "assets")))
 ANEXOS_DIR = Path(os.getenv("ANEXOS_PATH", str(BASE_DIR / "anexos")))
+# Pasta servida pelo Streamlit em app/static (precisa ficar ao lado do app.py)
+STATIC_PATH = BASE_DIR / "static"
 
 # Criar diretórios se não existirem
 DATA_PATH.mkdir(exist_ok=True)
@@ -23,8 +25,46 @@ APP_TITLE = os.getenv("APP_TITLE", "Programa +GEMS")
 APP_DESCRIPTION = os.getenv("APP_DESCRIPTION", "Forje sua lenda, Herói!")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin")
 CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))
+# Versões de tabelas mantidas no cache de leitura; as mais antigas são descartadas primeiro
+DATA_CACHE_ENTRIES = int(os.getenv("DATA_CACHE_ENTRIES", "128"))
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 
+# Backend de armazenamento: "csv" (padrão) ou "sqlite"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "csv").lower()
+SQLITE_PATH = Path(os.getenv("SQLITE_PATH", str(DATA_PATH / "gems.db")))
+
+# Snapshots colunares (Parquet) dos CSVs, usados quando o pyarrow está instalado
+USE_SNAPSHOTS = os.getenv("USE_SNAPSHOTS", "true").lower() == "true"
+SNAPSHOT_PATH = Path(os.getenv("SNAPSHOT_PATH", str(DATA_PATH / ".snapshots")))
+
+# Tamanho máximo dos anexos das nomeações, em MB
+MAX_ATTACHMENT_MB = int(os.getenv("MAX_ATTACHMENT_MB", "25"))
+
+# Miniaturas de ícones e da capa, geradas na primeira utilização
+THUMBNAIL_PATH = Path(os.getenv("THUMBNAIL_PATH", str(DATA_PATH / ".thumbnails")))
+
+# Arquivos temporários das exportações de histórico
+EXPORTS_PATH = Path(os.getenv("EXPORTS_PATH", str(DATA_PATH / ".exports")))
+
+# Sequências de IDs do backend CSV
+SEQUENCES_PATH = Path(os.getenv("SEQUENCES_PATH", str(DATA_PATH / ".sequences")))
+
+# Particionamento por data das tabelas de nomeações: "month", "quarter" ou "none"
+PARTITION_BY = os.getenv("PARTITION_BY", "month").lower()
+# Partições de anos encerrados há mais de N meses são compactadas em .csv.gz (0 desativa)
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "0"))
+
+# Prazo máximo (ms) para gravar nomeações enfileiradas; 0 grava de forma síncrona
+WRITE_BEHIND_MS = int(os.getenv("WRITE_BEHIND_MS", "200"))
+# Tentativas de gravação de um registro enfileirado antes de ir para o arquivo de rejeitados
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+# Espera (ms) antes de regravar um registro que falhou; dobra a cada nova falha (até 60 s)
+WRITE_BEHIND_RETRY_MS = int(os.getenv("WRITE_BEHIND_RETRY_MS", "1000"))
+DEAD_LETTER_PATH = Path(os.getenv("DEAD_LETTER_PATH", str(DATA_PATH / "write_behind_rejeitados.jsonl")))
+
+# Entradas do cache LRU de resultados filtrados do Salão dos Heróis (compartilhado entre sessões)
+DASHBOARD_CACHE_ENTRIES = int(os.getenv("DASHBOARD_CACHE_ENTRIES", "64"))
+
 # Configuração de cores
 PRIMARY_COLOR = os.getenv("STREAMLIT_THEME_PRIMARY_COLOR", "#6B7E7D")
 BACKGROUND_COLOR = os.getenv("STREAMLIT_THEME_BACKGROUND_COLOR", "#FFFFFF")
@@ -211,14 +251,52 @@ def apply_custom_styles():
 DATA_FILES = {
     "hero": {
         "path": DATA_PATH / "dim_hero.csv",
-        "cols": ['id_hero', 'hero_name', 'hero_team', 'start_date', 'update_date']
+        "table": "dim_hero",
+        "key": "id_hero",
+        "id_start": 101,
+        "cols": ['id_hero', 'hero_name', 'hero_team', 'start_date', 'update_date'],
+        "types": {'id_hero': 'int', 'hero_team': 'category', 'start_date': 'date', 'update_date': 'date'},
+        "indexes": ['hero_name', 'hero_team']
     },
     "map": {
-        "path": DATA_PATH / "dim_map.csv", 
-        "cols": ['id_mission', 'mission_name', 'mission_discribe', 'GemsAwarded', 'id_pillar', 'pillar', 'start_date', 'update_date']
+        "path": DATA_PATH / "dim_map.csv",
+        "table": "dim_map",
+        "key": "id_mission",
+        "id_start": 1,
+        "cols": ['id_mission', 'mission_name', 'mission_discribe', 'GemsAwarded', 'id_pillar', 'pillar', 'start_date', 'update_date'],
+        "types": {'id_mission': 'int', 'GemsAwarded': 'int', 'id_pillar': 'int', 'pillar': 'category', 'start_date': 'date', 'update_date': 'date'},
+        "indexes": ['mission_name', 'pillar']
     },
     "nomination": {
         "path": DATA_PATH / "fact_nomeacao.csv",
-        "cols": ['id_nomeacao', 'data_submissao', 'id_nomeador', 'id_nomeado', 'id_missao', 'justificativa', 'status', 'caminho_anexo']
+        "table": "fact_nomeacao",
+        "key": "id_nomeacao",
+        "id_start": 1,
+        "cols": ['id_nomeacao', 'data_submissao', 'id_nomeador', 'id_nomeado', 'id_missao', 'justificativa', 'status', 'caminho_anexo'],
+        "types": {'id_nomeacao': 'int', 'data_submissao': 'date', 'id_nomeador': 'int', 'id_nomeado': 'int', 'id_missao': 'int', 'status': 'category'},
+        "indexes": ['data_submissao', 'id_nomeador', 'id_nomeado', 'id_missao', 'status'],
+        "partition_col": "data_submissao"
+    },
+    # Visão materializada das nomeações aprovadas, mantida por utils/recognition_view.py
+    "recognition": {
+        "path": DATA_PATH / "mv_reconhecimentos.csv",
+        "table": "mv_reconhecimentos",
+        "key": "id_nomeacao",
+        "cols": ['id_nomeacao', 'data_submissao', 'id_nomeado', 'Herói', 'Time', 'id_nomeador', 'Nomeador', 'id_missao', 'mission_name', 'pillar', 'GemsAwarded'],
+        "types": {'id_nomeacao': 'int', 'data_submissao': 'date', 'id_nomeado': 'int', 'Time': 'category', 'id_nomeador': 'int', 'id_missao': 'int', 'pillar': 'category', 'GemsAwarded': 'int'},
+        "indexes": ['data_submissao', 'id_nomeado', 'id_nomeador', 'id_missao'],
+        "partition_col": "data_submissao",
+        "derived": True
+    },
+    # Agregados por dia, herói e pilar, mantidos junto com a visão de reconhecimentos
+    "recognition_daily": {
+        "path": DATA_PATH / "agg_reconhecimentos_diarios.csv",
+        "table": "agg_reconhecimentos_diarios",
+        "key": "agg_key",
+        "cols": ['agg_key', 'data_submissao', 'id_nomeado', 'Herói', 'Time', 'pillar', 'GemsAwarded', 'nominations'],
+        "types": {'data_submissao': 'date', 'id_nomeado': 'int', 'Time': 'category', 'pillar': 'category', 'GemsAwarded': 'int', 'nominations': 'int'},
+        "indexes": ['data_submissao', 'id_nomeado', 'pillar'],
+        "partition_col": "data_submissao",
+        "derived": True
     },
 }
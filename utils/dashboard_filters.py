@@ -0,0 +1,74 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Estado dos filtros do Salão dos Heróis; None significa "sem filtro" naquela dimensão.
+# date_range é (início, fim) como date; chart_day é a data clicada no gráfico diário.
+FilterState = namedtuple('FilterState', ['date_range', 'heroes', 'pillars', 'teams', 'chart_pillar', 'chart_day'])
+
+DATE_COL = 'data_submissao'
+# Colunas categóricas filtráveis: campo do FilterState -> coluna do DataFrame
+CATEGORY_FILTERS = {'heroes': 'Herói', 'pillars': 'pillar', 'teams': 'Time'}
+
+def _day_numbers(dates):
+    """Datas como número de dias desde 1970-01-01 (NaT vira o menor inteiro e nunca passa no filtro)"""
+    return pd.to_datetime(dates).to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+def _day_number(value):
+    return int(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64))
+
+def build_filter_index(df):
+    """Pré-calcula dias inteiros e códigos categóricos das colunas filtráveis"""
+    index = {'rows': len(df), 'days': _day_numbers(df[DATE_COL])}
+    for col in CATEGORY_FILTERS.values():
+        categorical = pd.Categorical(df[col])
+        index[col] = (categorical.codes, categorical.categories)
+    return index
+
+@st.cache_resource(max_entries=64)
+def _cached_filter_index(_df, file_key, version, date_range):
+    """Índice de filtros em cache por (tabela, versão, período lido); somente leitura"""
+    index = build_filter_index(_df)
+    logger.debug(f"Índice de filtros montado para {file_key} {date_range}: {index['rows']} linhas")
+    return index
+
+def get_filter_index(df, file_key, version, date_range=None):
+    """Índice de filtros do DataFrame lido de file_key na versão dada (a retornada por load_data_versioned)"""
+    return _cached_filter_index(df, file_key, version, date_range)
+
+def _category_mask(codes, categories, selected):
+    """Máscara por tabela de consulta: um booleano por categoria, indexado pelos códigos das linhas"""
+    allowed = np.zeros(len(categories) + 1, dtype=bool)
+    positions = categories.get_indexer(list(selected))
+    allowed[positions[positions >= 0]] = True
+    # O código -1 (valor ausente) cai na última posição, sempre False
+    return allowed[codes]
+
+def filter_mask(index, state):
+    """Combina período, heróis, pilares, times e seleção dos gráficos em uma única máscara"""
+    mask = np.ones(index['rows'], dtype=bool)
+    days = index['days']
+    if state.date_range:
+        start, end = state.date_range
+        mask &= (days >= _day_number(start)) & (days <= _day_number(end))
+    if state.chart_day is not None:
+        mask &= days == _day_number(state.chart_day)
+
+    selections = {field: getattr(state, field) for field in CATEGORY_FILTERS}
+    if state.chart_pillar is not None:
+        pillars = selections['pillars']
+        selections['pillars'] = [state.chart_pillar] if pillars is None or state.chart_pillar in pillars else []
+    for field, col in CATEGORY_FILTERS.items():
+        if selections[field] is not None:
+            mask &= _category_mask(*index[col], selections[field])
+    return mask
+
+def filter_frame(df, file_key, version, state, date_range=None):
+    """Aplica o estado dos filtros ao DataFrame lido de file_key na versão dada (no período date_range, se houver)"""
+    if df.empty:
+        return df
+    return df[filter_mask(get_filter_index(df, file_key, version, date_range), state)]
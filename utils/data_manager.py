@@ -2,7 +2,12 @@ import streamlit as st
 import pandas as pd
 from pathlib import Path
 import logging
-from .config import DATA_FILES, CACHE_TTL
+import threading
+import atexit
+import time
+import json
+from .config import DATA_FILES, CACHE_TTL, DATA_CACHE_ENTRIES, WRITE_BEHIND_MS, WRITE_BEHIND_MAX_ATTEMPTS, WRITE_BEHIND_RETRY_MS, DEAD_LETTER_PATH
+from .storage import get_storage, conform_frame
 
 logger = logging.getLogger(__name__)
 
@@ -13,76 +18,195 @@ def initialize_session_state():
     if 'is_admin' not in st.session_state:
         st.session_state.is_admin = False
 
-@st.cache_data(ttl=CACHE_TTL)
-def load_data(file_key):
-    """Carrega dados dos arquivos CSV com cache"""
-    config = DATA_FILES.get(file_key)
-    if not config:
+def get_data_version(file_key):
+    """Retorna a versão atual da tabela no backend de armazenamento"""
+    return get_storage().version(file_key)
+
+def load_data(file_key, columns=None, date_range=None):
+    """Carrega dados do backend com cache por versão; date_range (início, fim) lê só o período pedido"""
+    return load_data_versioned(file_key, columns, date_range)[1]
+
+def load_data_versioned(file_key, columns=None, date_range=None, version=None):
+    """Como load_data, mas retorna (versão, DataFrame) com a versão que chaveou a leitura em cache.
+
+    Caches derivados do DataFrame devem usar essa versão, e não uma lida depois, que pode já ser de outra escrita.
+    Um cache já chaveado por versão pode passá-la em version para ler o DataFrame guardado com essa mesma chave.
+    """
+    if file_key not in DATA_FILES:
         logger.error(f"Configuração não encontrada para: {file_key}")
-        return pd.DataFrame()
-    
-    file_path, columns = config["path"], config["cols"]
-    
-    if not file_path.exists():
-        logger.info(f"Criando arquivo {file_path.name}")
-        df = pd.DataFrame(columns=columns)
-        df.to_csv(file_path, index=False, sep=';')
-        return df
+        return None, pd.DataFrame()
+    date_range = tuple(None if d is None else pd.Timestamp(d).date() for d in date_range) if date_range else None
+    if version is None:
+        version = get_data_version(file_key)
+    return version, _load_table(file_key, version, tuple(columns) if columns else None, date_range)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=DATA_CACHE_ENTRIES)
+def _load_table(file_key, version, columns=None, date_range=None):
+    """Lê a tabela do backend; o cache é invalidado quando a versão muda"""
+    table_name = DATA_FILES[file_key]["path"].name
     
     try:
-        df = pd.read_csv(file_path, sep=';', dtype=str)
-        for col in columns:
-            if col not in df.columns:
-                df[col] = pd.NA
-        logger.debug(f"Dados carregados de {file_path.name}: {len(df)} registros")
-        return df.astype(str)
+        df = get_storage().read(file_key, columns, date_range)
+        logger.debug(f"Dados carregados de {table_name}: {len(df)} registros")
+        return df
         
     except (pd.errors.EmptyDataError, FileNotFoundError):
-        logger.warning(f"Arquivo {file_path.name} vazio ou não encontrado")
-        return pd.DataFrame(columns=columns)
+        logger.warning(f"Arquivo {table_name} vazio ou não encontrado")
+        return conform_frame(pd.DataFrame(), file_key, columns)
     except Exception as e:
-        logger.error(f"Erro crítico ao carregar {file_path.name}: {e}")
-        st.error(f"Erro crítico ao carregar {file_path.name}: {e}")
-        return pd.DataFrame(columns=columns)
+        logger.error(f"Erro crítico ao carregar {table_name}: {e}")
+        st.error(f"Erro crítico ao carregar {table_name}: {e}")
+        return conform_frame(pd.DataFrame(), file_key, columns)
 
-def save_data(file_key, df):
-    """Salva dados em arquivo CSV"""
-    file_path = DATA_FILES.get(file_key)["path"]
+def load_rows(file_key, keys, key_col=None, columns=None):
+    """Lê direto do backend só os registros identificados pelas chaves (sem passar pelo cache da tabela)"""
+    return get_storage().read_rows(file_key, keys, key_col, columns)
+
+def next_id(file_key):
+    """Reserva o próximo ID da tabela na sequência do backend"""
+    return get_storage().next_id(file_key)
+
+def _run_write(file_key, action, description, count):
+    """Executa uma escrita no backend e registra o resultado"""
+    table_name = DATA_FILES.get(file_key)["path"].name
     try:
-        df.to_csv(file_path, index=False, sep=';')
-        st.cache_data.clear()
-        logger.info(f"Dados salvos em {file_path.name}: {len(df)} registros")
+        action(get_storage())
+        logger.info(f"{description} em {table_name}: {count} registros")
         return True
     except Exception as e:
-        logger.error(f"Falha ao salvar dados em {file_path.name}: {e}")
-        st.error(f"Falha ao salvar dados em {file_path.name}: {e}")
+        logger.error(f"Falha ao salvar dados em {table_name}: {e}")
+        st.error(f"Falha ao salvar dados em {table_name}: {e}")
         return False
 
-@st.cache_data(ttl=CACHE_TTL)
-def get_dashboard_data():
-    """Prepara dados para o dashboard com melhor performance"""
-    df_heroes = load_data('hero')
-    df_missions = load_data('map')
-    df_nominations = load_data('nomination')
-    
-    if df_nominations.empty or df_missions.empty or df_heroes.empty:
-        return pd.DataFrame()
-    
-    df_missions['GemsAwarded'] = pd.to_numeric(df_missions['GemsAwarded'], errors='coerce').fillna(0)
-    df_nominations['data_submissao'] = pd.to_datetime(df_nominations['data_submissao'], errors='coerce')
-    
-    approved = df_nominations[df_nominations['status'].str.strip().str.lower() == 'aprovado'].copy()
-    
-    if approved.empty:
-        return pd.DataFrame()
-    
-    data = approved.merge(df_heroes, left_on='id_nomeado', right_on='id_hero', suffixes=('_nomeado', '_hero'))
-    data = data.rename(columns={'hero_name': 'Herói', 'hero_team': 'Time'})
-    data = data.merge(df_heroes, left_on='id_nomeador', right_on='id_hero', suffixes=('', '_nomeador'))
-    data = data.rename(columns={'hero_name': 'Nomeador'})
-    data = data.merge(df_missions, left_on='id_missao', right_on='id_mission')
-    
-    return data[[
-        'data_submissao', 'Herói', 'Time', 'Nomeador', 'mission_name', 
-        'pillar', 'GemsAwarded', 'justificativa'
-    ]]
+def save_data(file_key, df):
+    """Salva a tabela completa"""
+    return _run_write(file_key, lambda storage: storage.write(file_key, df), "Dados salvos", len(df))
+
+def append_data(file_key, rows):
+    """Acrescenta registros sem reescrever a tabela"""
+    return _run_write(file_key, lambda storage: storage.append(file_key, rows), "Registros acrescentados", len(rows))
+
+def update_data(file_key, keys, values, key_col=None):
+    """Atualiza colunas dos registros identificados pelas chaves"""
+    return _run_write(file_key, lambda storage: storage.update(file_key, keys, values, key_col), "Registros atualizados", len(keys))
+
+def delete_data(file_key, keys, key_col=None):
+    """Remove os registros identificados pelas chaves"""
+    return _run_write(file_key, lambda storage: storage.delete(file_key, keys, key_col), "Registros excluídos", len(keys))
+
+def increment_data(file_key, rows, sum_cols, count_col):
+    """Soma colunas nos registros das chaves dadas em uma única escrita, removendo os que zeram count_col"""
+    return _run_write(
+        file_key, lambda storage: storage.increment(file_key, rows, sum_cols, count_col), "Registros incrementados", len(rows)
+    )
+
+# Fila de escrita em segundo plano: submissões são aceitas na hora e gravadas em lote.
+# Cada entrada é (tabela, registros, tentativas, prazo); entradas que já falharam são gravadas isoladas
+# e só voltam a ser tentadas quando o prazo (time.monotonic) vence, com espera crescente a cada falha.
+_write_queue = []
+_write_cond = threading.Condition()
+_write_state = {"writer": None, "committing": 0}
+
+def enqueue_rows(file_key, rows):
+    """Enfileira registros para gravação em lote em até WRITE_BEHIND_MS milissegundos"""
+    if WRITE_BEHIND_MS <= 0:
+        return append_data(file_key, rows)
+    with _write_cond:
+        writer = _write_state["writer"]
+        if writer is None or not writer.is_alive():
+            writer = threading.Thread(target=_write_behind_loop, name="gems-write-behind", daemon=True)
+            _write_state["writer"] = writer
+            writer.start()
+        _write_queue.append((file_key, list(rows), 0, time.monotonic()))
+        _write_cond.notify_all()
+    return True
+
+def _write_behind_loop():
+    """Aguarda registros na fila e os grava em commits agrupados"""
+    while True:
+        with _write_cond:
+            _write_cond.wait_for(lambda: _write_queue)
+            delay = min(due for *_, due in _write_queue) - time.monotonic()
+            if delay > 0:
+                # Só há regravações aguardando o prazo; novas submissões acordam o laço antes
+                _write_cond.wait(delay)
+                continue
+        # Janela de agrupamento: as submissões que chegarem nesse intervalo vão no mesmo commit
+        time.sleep(WRITE_BEHIND_MS / 1000)
+        _commit_pending()
+
+def _dead_letter(file_key, rows, error, attempts):
+    """Registra em DEAD_LETTER_PATH (JSON por linha) os registros que não puderam ser gravados"""
+    logger.error(
+        f"Registros descartados da fila de {DATA_FILES[file_key]['path'].name} após "
+        f"{attempts} tentativas: {error}; gravados em {DEAD_LETTER_PATH.name}"
+    )
+    try:
+        with open(DEAD_LETTER_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(
+                {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'file_key': file_key, 'error': str(error), 'rows': rows},
+                ensure_ascii=False, default=str
+            ) + '\n')
+    except OSError as e:
+        logger.error(f"Falha ao gravar {DEAD_LETTER_PATH.name}: {e}; registros perdidos: {rows}")
+
+def _retry_delay(attempts):
+    """Espera, em segundos, antes da próxima tentativa de uma entrada que já falhou attempts vezes"""
+    return min(WRITE_BEHIND_RETRY_MS / 1000 * 2 ** (attempts - 1), 60)
+
+def _commit_pending(force=False):
+    """Grava de uma vez os registros enfileirados com prazo vencido (todos, se force), agrupados por tabela"""
+    with _write_cond:
+        now = time.monotonic()
+        batch = [entry for entry in _write_queue if force or entry[3] <= now]
+        _write_queue[:] = [entry for entry in _write_queue if not (force or entry[3] <= now)]
+        _write_state["committing"] += 1
+    try:
+        # Entradas novas vão num único commit por tabela; as que já falharam, uma a uma
+        commits = {}
+        for position, (file_key, rows, attempts, _) in enumerate(batch):
+            group = (file_key, None) if attempts == 0 else (file_key, position)
+            commits.setdefault(group, []).append((file_key, rows, attempts))
+        retry = []
+        for (file_key, _), entries in commits.items():
+            table_name = DATA_FILES[file_key]["path"].name
+            rows = [row for _, entry_rows, _ in entries for row in entry_rows]
+            try:
+                get_storage().append(file_key, rows)
+                logger.info(f"Commit em lote em {table_name}: {len(rows)} registros")
+            except Exception as e:
+                logger.error(f"Falha no commit em lote em {table_name}: {e}")
+                for _, entry_rows, attempts in entries:
+                    if attempts + 1 >= WRITE_BEHIND_MAX_ATTEMPTS:
+                        _dead_letter(file_key, entry_rows, e, attempts + 1)
+                    else:
+                        # Volta para a fila e, vencida a espera, é gravada sem os registros de outras entradas
+                        retry.append((file_key, entry_rows, attempts + 1, time.monotonic() + _retry_delay(attempts + 1)))
+        if retry:
+            with _write_cond:
+                _write_queue[0:0] = retry
+    finally:
+        with _write_cond:
+            _write_state["committing"] -= 1
+            _write_cond.notify_all()
+
+def flush_writes(timeout=10):
+    """Grava imediatamente os registros enfileirados e aguarda commits em andamento"""
+    with _write_cond:
+        pending = bool(_write_queue)
+    if pending:
+        _commit_pending(force=True)
+    with _write_cond:
+        return _write_cond.wait_for(lambda: not _write_queue and not _write_state["committing"], timeout)
+
+def _flush_at_exit():
+    """Na saída do processo, grava a fila e manda para os rejeitados o que ainda aguardava nova tentativa"""
+    if flush_writes():
+        return
+    with _write_cond:
+        leftover = _write_queue[:]
+        _write_queue.clear()
+    for file_key, rows, attempts, _ in leftover:
+        _dead_letter(file_key, rows, "processo encerrado antes da nova tentativa", attempts)
+
+atexit.register(_flush_at_exit)
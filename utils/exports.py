@@ -0,0 +1,160 @@
+import pandas as pd
+import argparse
+import logging
+import xlsxwriter
+from io import BytesIO
+from .storage import get_storage
+from .attachments import attachment_name
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = pq = None
+
+logger = logging.getLogger(__name__)
+
+# Histórico completo das nomeações com heróis, missão e pilar: coluna -> tipo
+HISTORY_TYPES = {
+    'id_nomeacao': 'Int64',
+    'data_submissao': 'datetime64[ns]',
+    'status': 'string',
+    'id_nomeador': 'Int64',
+    'Nomeador': 'string',
+    'id_nomeado': 'Int64',
+    'Herói': 'string',
+    'Time': 'string',
+    'id_missao': 'Int64',
+    'mission_name': 'string',
+    'pillar': 'string',
+    'GemsAwarded': 'Int64',
+    'justificativa': 'string',
+    'anexo': 'string',
+}
+HISTORY_STATUSES = ['Pendente', 'Aprovado', 'Reprovado']
+HISTORY_CHUNK_SIZE = 5000
+# Limite de linhas de uma planilha do Excel (incluindo o cabeçalho)
+XLSX_MAX_ROWS = 1048576
+
+# Formatos de exportação: rótulo -> extensão e tipo MIME
+EXPORT_FORMATS = {
+    "Excel (.xlsx)": {"ext": "xlsx", "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    "CSV (.csv)": {"ext": "csv", "mime": "text/csv"},
+}
+if pyarrow is not None:
+    EXPORT_FORMATS["Parquet (.parquet)"] = {"ext": "parquet", "mime": "application/vnd.apache.parquet"}
+
+def export_dataframe(df, ext, sheet_name="Dados"):
+    """Serializa o DataFrame no formato pedido e retorna os bytes do arquivo"""
+    buffer = BytesIO()
+    if ext == "xlsx":
+        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    elif ext == "csv":
+        # Mesmo separador dos CSVs do programa; BOM para o Excel reconhecer acentos
+        df.to_csv(buffer, sep=';', index=False, encoding='utf-8-sig')
+    elif ext == "parquet":
+        df.to_parquet(buffer, index=False)
+    else:
+        raise ValueError(f"Formato de exportação desconhecido: {ext}")
+    logger.info(f"Exportação {ext} gerada: {len(df)} registros, {buffer.tell()} bytes")
+    return buffer.getvalue()
+
+def iter_history(date_range=None, statuses=None, chunk_size=HISTORY_CHUNK_SIZE):
+    """Histórico das nomeações em blocos, já com heróis e missões; nunca monta a tabela inteira"""
+    storage = get_storage()
+    heroes = storage.read('hero', ['id_hero', 'hero_name', 'hero_team']).dropna(subset=['id_hero']).set_index('id_hero')
+    missions = storage.read('map', ['id_mission', 'mission_name', 'pillar', 'GemsAwarded']).dropna(subset=['id_mission']).set_index('id_mission')
+    wanted = {status.strip().lower() for status in statuses} if statuses else None
+
+    for chunk in storage.iter_chunks('nomination', date_range=date_range, chunk_size=chunk_size):
+        if wanted is not None:
+            chunk = chunk[chunk['status'].astype(str).str.strip().str.lower().isin(wanted)]
+        if chunk.empty:
+            continue
+        history = pd.DataFrame({
+            'id_nomeacao': chunk['id_nomeacao'],
+            'data_submissao': chunk['data_submissao'],
+            'status': chunk['status'].astype(object),
+            'id_nomeador': chunk['id_nomeador'],
+            'Nomeador': chunk['id_nomeador'].map(heroes['hero_name']),
+            'id_nomeado': chunk['id_nomeado'],
+            'Herói': chunk['id_nomeado'].map(heroes['hero_name']),
+            'Time': chunk['id_nomeado'].map(heroes['hero_team'].astype(object)),
+            'id_missao': chunk['id_missao'],
+            'mission_name': chunk['id_missao'].map(missions['mission_name']),
+            'pillar': chunk['id_missao'].map(missions['pillar'].astype(object)),
+            'GemsAwarded': chunk['id_missao'].map(missions['GemsAwarded']),
+            'justificativa': chunk['justificativa'],
+            'anexo': chunk['caminho_anexo'].map(attachment_name, na_action='ignore'),
+        })
+        yield history.astype(HISTORY_TYPES)
+
+def _write_history_csv(path, chunks):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        pd.DataFrame(columns=list(HISTORY_TYPES)).to_csv(f, sep=';', index=False, lineterminator='\n')
+        for chunk in chunks:
+            chunk.to_csv(f, sep=';', header=False, index=False, lineterminator='\n', date_format='%Y-%m-%d')
+            yield len(chunk)
+
+def _write_history_xlsx(path, chunks):
+    # constant_memory grava cada linha no disco assim que a próxima começa
+    workbook = xlsxwriter.Workbook(str(path), {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd'})
+    sheet, sheet_count, row_number = None, 0, XLSX_MAX_ROWS
+    try:
+        for chunk in chunks:
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for row in values.itertuples(index=False):
+                if row_number >= XLSX_MAX_ROWS:
+                    sheet_count += 1
+                    sheet = workbook.add_worksheet(f"Histórico {sheet_count}" if sheet_count > 1 else "Histórico")
+                    sheet.write_row(0, 0, list(HISTORY_TYPES))
+                    row_number = 1
+                sheet.write_row(row_number, 0, row)
+                row_number += 1
+            yield len(chunk)
+        if sheet is None:
+            workbook.add_worksheet("Histórico").write_row(0, 0, list(HISTORY_TYPES))
+    finally:
+        workbook.close()
+
+def _write_history_parquet(path, chunks):
+    schema = pyarrow.Schema.from_pandas(pd.DataFrame(columns=list(HISTORY_TYPES)).astype(HISTORY_TYPES), preserve_index=False)
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pyarrow.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield len(chunk)
+
+HISTORY_WRITERS = {"csv": _write_history_csv, "xlsx": _write_history_xlsx, "parquet": _write_history_parquet}
+
+def export_history(path, ext, date_range=None, statuses=None, progress=None):
+    """Grava o histórico no arquivo em blocos; progress(linhas) é chamado após cada bloco"""
+    if ext not in HISTORY_WRITERS or (ext == "parquet" and pq is None):
+        raise ValueError(f"Formato de exportação indisponível: {ext}")
+    total = 0
+    for rows in HISTORY_WRITERS[ext](path, iter_history(date_range, statuses)):
+        total += rows
+        if progress:
+            progress(total)
+    logger.info(f"Histórico exportado em {path}: {total} registros")
+    return total
+
+def main(argv=None):
+    """Linha de comando: python -m utils.exports historico.csv --inicio 2025-01-01 --status Aprovado"""
+    parser = argparse.ArgumentParser(description="Exporta o histórico completo das nomeações")
+    parser.add_argument("saida", help="Arquivo de saída (.csv, .xlsx ou .parquet)")
+    parser.add_argument("--inicio", type=pd.Timestamp, help="Data inicial (AAAA-MM-DD)")
+    parser.add_argument("--fim", type=pd.Timestamp, help="Data final (AAAA-MM-DD)")
+    parser.add_argument("--status", action="append", choices=HISTORY_STATUSES, help="Filtra por status (pode repetir)")
+    args = parser.parse_args(argv)
+
+    date_range = None
+    if args.inicio or args.fim:
+        # O lado sem data fica aberto (None) em vez de usar Timestamp.min/max
+        date_range = (args.inicio.date() if args.inicio else None, args.fim.date() if args.fim else None)
+    ext = args.saida.rsplit('.', 1)[-1].lower()
+    total = export_history(args.saida, ext, date_range, args.status)
+    print(f"{total} nomeações exportadas para {args.saida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+@contextmanager
+def atomic_write(target):
+    """Fornece um caminho temporário ao lado de target, exclusivo do processo e da thread, e o move para target no final.
+
+    O temporário mantém a extensão do destino (quem grava pode deduzir o formato por ela) e é removido em caso de erro;
+    leitores nunca veem um arquivo pela metade.
+    """
+    target = Path(target)
+    tmp_path = target.with_name(f"{target.stem}.{os.getpid()}.{threading.get_ident()}.tmp{target.suffix}")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, target)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,48 @@
+import streamlit as st
+import logging
+from .data_manager import get_data_version, load_data_versioned
+
+logger = logging.getLogger(__name__)
+
+def normalize_name(name):
+    """Normaliza nomes para comparação sem diferenciar caixa e espaços"""
+    return str(name).strip().lower()
+
+def get_hero_index():
+    """Índices de heróis (nome, nome normalizado e ID) da versão atual da tabela"""
+    return _build_hero_index(get_data_version('hero'))
+
+def get_mission_index():
+    """Índices de missões (nome, pilar+nome e ID) da versão atual da tabela"""
+    return _build_mission_index(get_data_version('map'))
+
+# Os índices são compartilhados entre sessões e devem ser tratados como somente leitura
+@st.cache_resource(max_entries=2)
+def _build_hero_index(version):
+    """Monta os dicionários de busca de heróis para uma versão da tabela"""
+    # Lê o DataFrame guardado em cache com esta mesma versão, não o atual (que pode já ser de outra escrita)
+    df = load_data_versioned('hero', version=version)[1].dropna(subset=['id_hero'])
+    ids = df['id_hero'].astype(int).tolist()
+    names = df['hero_name'].astype(str).tolist()
+    index = {
+        'by_name': dict(zip(names, ids)),
+        'by_normalized_name': {normalize_name(name): hero_id for name, hero_id in zip(names, ids)},
+        'by_id': dict(zip(ids, df.to_dict('records')))
+    }
+    logger.debug(f"Índice de heróis montado: {len(ids)} registros")
+    return index
+
+@st.cache_resource(max_entries=2)
+def _build_mission_index(version):
+    """Monta os dicionários de busca de missões para uma versão da tabela"""
+    df = load_data_versioned('map', version=version)[1].dropna(subset=['id_mission'])
+    ids = df['id_mission'].astype(int).tolist()
+    names = df['mission_name'].astype(str).tolist()
+    pillars = df['pillar'].astype(str).tolist()
+    index = {
+        'by_name': dict(zip(names, ids)),
+        'by_pillar_and_name': {(pillar, name): mission_id for pillar, name, mission_id in zip(pillars, names, ids)},
+        'by_id': dict(zip(ids, df.to_dict('records')))
+    }
+    logger.debug(f"Índice de missões montado: {len(ids)} registros")
+    return index
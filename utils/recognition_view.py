@@ -0,0 +1,195 @@
+import streamlit as st
+import pandas as pd
+import logging
+from .config import DATA_FILES
+from .data_manager import get_data_version, load_data, load_data_versioned, load_rows, save_data, append_data, update_data, delete_data, increment_data
+from .storage import get_storage, conform_frame
+
+logger = logging.getLogger(__name__)
+
+VIEW_COLS = DATA_FILES['recognition']['cols']
+AGGREGATE_COLS = DATA_FILES['recognition_daily']['cols']
+DASHBOARD_COLS = ['data_submissao', 'Herói', 'Time', 'Nomeador', 'mission_name', 'pillar', 'GemsAwarded']
+FILTER_OPTION_COLS = ['data_submissao', 'Herói', 'pillar', 'Time']
+
+def build_recognition_rows(df_nominations, df_heroes, df_missions):
+    """Junta nomeações aprovadas com heróis e missões no formato da visão"""
+    approved = df_nominations[df_nominations['status'].str.strip().str.lower() == 'aprovado']
+    if approved.empty or df_heroes.empty or df_missions.empty:
+        return pd.DataFrame(columns=VIEW_COLS)
+
+    heroes = df_heroes[['id_hero', 'hero_name', 'hero_team']]
+    data = approved[['id_nomeacao', 'data_submissao', 'id_nomeador', 'id_nomeado', 'id_missao']].merge(
+        heroes.rename(columns={'id_hero': 'id_nomeado', 'hero_name': 'Herói', 'hero_team': 'Time'}),
+        on='id_nomeado'
+    )
+    data = data.merge(
+        heroes[['id_hero', 'hero_name']].rename(columns={'id_hero': 'id_nomeador', 'hero_name': 'Nomeador'}),
+        on='id_nomeador'
+    )
+    data = data.merge(
+        df_missions[['id_mission', 'mission_name', 'pillar', 'GemsAwarded']].rename(columns={'id_mission': 'id_missao'}),
+        on='id_missao'
+    )
+    data['GemsAwarded'] = data['GemsAwarded'].fillna(0)
+    return data[VIEW_COLS]
+
+def aggregate_recognitions(df_view):
+    """Agrega linhas da visão por dia, herói e pilar"""
+    if df_view.empty:
+        return pd.DataFrame(columns=AGGREGATE_COLS)
+
+    df = df_view.assign(
+        data_submissao=pd.to_datetime(df_view['data_submissao']).dt.normalize(),
+        pillar=df_view['pillar'].astype(str),
+        nominations=1
+    )
+    agg = df.groupby(['data_submissao', 'id_nomeado', 'pillar']).agg(
+        Herói=('Herói', 'last'),
+        Time=('Time', 'last'),
+        GemsAwarded=('GemsAwarded', 'sum'),
+        nominations=('nominations', 'sum')
+    ).reset_index()
+    agg['agg_key'] = (
+        agg['data_submissao'].dt.strftime('%Y-%m-%d') + '|' + agg['id_nomeado'].astype(str) + '|' + agg['pillar']
+    )
+    return agg[AGGREGATE_COLS]
+
+def _apply_aggregate_delta(removed, added):
+    """Subtrai as linhas removidas e soma as adicionadas nos agregados afetados"""
+    if removed.empty and added.empty:
+        return True
+
+    removed_agg = aggregate_recognitions(removed)
+    removed_agg[['GemsAwarded', 'nominations']] = -removed_agg[['GemsAwarded', 'nominations']]
+    delta = pd.concat([removed_agg, aggregate_recognitions(added)], ignore_index=True)
+    delta = delta.groupby('agg_key', as_index=False).agg(
+        data_submissao=('data_submissao', 'first'),
+        id_nomeado=('id_nomeado', 'first'),
+        Herói=('Herói', 'last'),
+        Time=('Time', 'last'),
+        pillar=('pillar', 'first'),
+        GemsAwarded=('GemsAwarded', 'sum'),
+        nominations=('nominations', 'sum')
+    )
+    # A soma é feita pelo armazenamento, sem ler os totais atuais antes
+    return increment_data(
+        'recognition_daily', delta[AGGREGATE_COLS].to_dict('records'), ['GemsAwarded', 'nominations'], 'nominations'
+    )
+
+def _view_rows(values, key_col):
+    """Linhas atuais da visão cujo key_col está entre os valores dados"""
+    return load_rows('recognition', values, key_col)
+
+def rebuild_recognition_view():
+    """Reconstrói a visão e os agregados a partir das tabelas base"""
+    df_view = build_recognition_rows(load_data('nomination'), load_data('hero'), load_data('map'))
+    logger.info(f"Visão de reconhecimentos reconstruída: {len(df_view)} registros")
+    return save_data('recognition', df_view) and save_data('recognition_daily', aggregate_recognitions(df_view))
+
+def ensure_recognition_view():
+    """Cria a visão e os agregados na primeira utilização"""
+    storage = get_storage()
+    if not storage.exists('recognition') or not storage.exists('recognition_daily'):
+        rebuild_recognition_view()
+
+def _apply_incremental(description, action):
+    """Aplica uma alteração incremental; em caso de falha reconstrói a visão"""
+    storage = get_storage()
+    if not storage.exists('recognition') or not storage.exists('recognition_daily'):
+        return rebuild_recognition_view()
+    # Leitura, remoção e inclusão na visão e soma nos agregados formam um só passo entre sessões concorrentes
+    with storage.transaction():
+        try:
+            if action():
+                return True
+        except Exception as e:
+            logger.error(f"Erro ao atualizar a visão de reconhecimentos ({description}): {e}")
+        logger.warning(f"Falha ao atualizar a visão de reconhecimentos ({description}); reconstruindo")
+        return rebuild_recognition_view()
+
+def refresh_nomination_status(ids, new_status):
+    """Atualiza a visão e os agregados após aprovação/reprovação de nomeações"""
+    def action():
+        removed = _view_rows(ids, 'id_nomeacao')
+        if not delete_data('recognition', ids):
+            return False
+        added = pd.DataFrame(columns=VIEW_COLS)
+        if new_status.strip().lower() == 'aprovado':
+            added = build_recognition_rows(load_rows('nomination', ids), load_data('hero'), load_data('map'))
+            if not added.empty and not append_data('recognition', added.to_dict('records')):
+                return False
+        return _apply_aggregate_delta(removed, added)
+    return _apply_incremental(f"status {new_status}", action)
+
+def refresh_hero(hero_id, hero_name, hero_team):
+    """Propaga a alteração de nome/time de um herói para a visão e os agregados"""
+    return _apply_incremental(f"herói {hero_id}", lambda: (
+        update_data('recognition', [hero_id], {'Herói': hero_name, 'Time': hero_team}, key_col='id_nomeado')
+        and update_data('recognition', [hero_id], {'Nomeador': hero_name}, key_col='id_nomeador')
+        and update_data('recognition_daily', [hero_id], {'Herói': hero_name, 'Time': hero_team}, key_col='id_nomeado')
+    ))
+
+def remove_hero(hero_id):
+    """Remove da visão os reconhecimentos de um herói excluído"""
+    def action():
+        removed = pd.concat(
+            [_view_rows([hero_id], 'id_nomeado'), _view_rows([hero_id], 'id_nomeador')], ignore_index=True
+        ).drop_duplicates('id_nomeacao')
+        return (
+            delete_data('recognition', [hero_id], key_col='id_nomeado')
+            and delete_data('recognition', [hero_id], key_col='id_nomeador')
+            and _apply_aggregate_delta(removed, removed.iloc[0:0])
+        )
+    return _apply_incremental(f"herói {hero_id}", action)
+
+def refresh_mission(mission_id, mission_name, gems, pillar):
+    """Propaga a alteração de uma missão para a visão e os agregados"""
+    def action():
+        removed = _view_rows([mission_id], 'id_missao')
+        added = removed.astype({'pillar': object}).assign(mission_name=mission_name, GemsAwarded=gems, pillar=pillar)
+        return update_data(
+            'recognition', [mission_id], {'mission_name': mission_name, 'GemsAwarded': gems, 'pillar': pillar}, key_col='id_missao'
+        ) and _apply_aggregate_delta(removed, added)
+    return _apply_incremental(f"missão {mission_id}", action)
+
+def remove_mission(mission_id):
+    """Remove da visão os reconhecimentos de uma missão excluída"""
+    def action():
+        removed = _view_rows([mission_id], 'id_missao')
+        return delete_data('recognition', [mission_id], key_col='id_missao') and _apply_aggregate_delta(removed, removed.iloc[0:0])
+    return _apply_incremental(f"missão {mission_id}", action)
+
+def get_dashboard_data(date_range=None):
+    """Lê (versão, visão materializada de reconhecimentos aprovados), opcionalmente só do período dado"""
+    ensure_recognition_view()
+    return load_data_versioned('recognition', DASHBOARD_COLS, date_range)
+
+def empty_dashboard_frame():
+    """Visão vazia com as colunas e tipos de get_dashboard_data"""
+    return conform_frame(pd.DataFrame(), 'recognition', DASHBOARD_COLS)
+
+def get_dashboard_aggregates(date_range=None):
+    """Lê (versão, agregados por dia, herói e pilar) usados pelas métricas do dashboard, só do período dado se houver"""
+    ensure_recognition_view()
+    return load_data_versioned('recognition_daily', date_range=date_range)
+
+def get_dashboard_filter_options():
+    """Período e valores disponíveis para os filtros do dashboard, ou None se ainda não há agregados"""
+    ensure_recognition_view()
+    return _cached_filter_options(get_data_version('recognition_daily'))
+
+# Compartilhado entre sessões e somente leitura: a tabela inteira só é lida quando a versão muda
+@st.cache_resource(max_entries=2)
+def _cached_filter_options(version):
+    """Opções dos filtros calculadas a partir dos agregados guardados em cache com a versão dada"""
+    _, df = load_data_versioned('recognition_daily', FILTER_OPTION_COLS, version=version)
+    if df.empty:
+        return None
+    return {
+        'min_date': df['data_submissao'].min().date(),
+        'max_date': df['data_submissao'].max().date(),
+        'heroes': sorted(df['Herói'].dropna().unique()),
+        'pillars': sorted(df['pillar'].dropna().unique()),
+        'teams': sorted(df['Time'].dropna().unique()),
+    }
@@ -0,0 +1,848 @@
+import sqlite3
+import argparse
+import threading
+import os
+import logging
+from contextlib import contextmanager
+from datetime import date
+import pandas as pd
+from pathlib import Path
+from .files import atomic_write
+from .config import (
+    DATA_FILES, DATA_PATH, STORAGE_BACKEND, SQLITE_PATH, USE_SNAPSHOTS, SNAPSHOT_PATH, SEQUENCES_PATH,
+    PARTITION_BY, ARCHIVE_AFTER_MONTHS
+)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+def conform_frame(df, file_key, columns=None):
+    """Garante as colunas declaradas e converte-as para os tipos de DATA_FILES"""
+    config = DATA_FILES[file_key]
+    for col in columns or config["cols"]:
+        if col not in df.columns:
+            df[col] = pd.NA
+    for col, kind in config.get("types", {}).items():
+        if col not in df.columns:
+            continue
+        if kind == 'int':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+        elif kind == 'float':
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        elif kind == 'date':
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif kind == 'category':
+            df[col] = df[col].astype('category')
+    return df if columns is None else df[list(columns)]
+
+def _to_db_value(value):
+    """Converte valores do pandas/numpy para tipos aceitos pelo armazenamento"""
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-%d")
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+@contextmanager
+def _locked_file(file_path):
+    """Abre o arquivo com trava exclusiva entre processos"""
+    with open(file_path, 'a+', encoding='utf-8') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield f
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _initial_sequence_value(df, file_key):
+    """Último ID em uso na tabela, usado para iniciar a sequência"""
+    config = DATA_FILES[file_key]
+    current = pd.to_numeric(df[config["key"]], errors='coerce').max() if not df.empty else None
+    return int(current) if pd.notna(current) else config.get("id_start", 1) - 1
+
+UNDATED_PARTITION = "sem_data"
+
+def _is_partitioned(file_key):
+    """Indica se a tabela é gravada em partições por data.
+
+    Partições existentes são sempre usadas, qualquer que seja PARTITION_BY; um CSV único existente continua
+    sendo usado até ser dividido explicitamente (python -m utils.storage particionar).
+    """
+    config = DATA_FILES[file_key]
+    if "partition_col" not in config:
+        return False
+    if _partition_dir(file_key).exists():
+        return True
+    return PARTITION_BY != "none" and not config["path"].exists()
+
+def _partition_dir(file_key):
+    return DATA_FILES[file_key]["path"].with_suffix('')
+
+def _partition_files(file_key):
+    """Partições existentes da tabela (AAAA-MM.csv, AAAA-Qn.csv ou AAAA.csv.gz)"""
+    part_dir = _partition_dir(file_key)
+    if not part_dir.exists():
+        return []
+    return sorted(list(part_dir.glob('*.csv')) + list(part_dir.glob('*.csv.gz')))
+
+def _partition_label(file_path):
+    return file_path.name.split('.')[0]
+
+def _partition_period(label):
+    """Período coberto pela partição, deduzido do nome"""
+    if label == UNDATED_PARTITION:
+        return None
+    if '-Q' in label:
+        return pd.Period(label.replace('-', ''), freq='Q')
+    if '-' in label:
+        return pd.Period(label, freq='M')
+    return pd.Period(label, freq='Y')
+
+def _partition_labels(dates):
+    """Nome da partição de cada data conforme PARTITION_BY"""
+    dates = pd.to_datetime(dates, errors='coerce')
+    if PARTITION_BY == "quarter":
+        labels = dates.dt.year.astype('Int64').astype(str) + '-Q' + dates.dt.quarter.astype('Int64').astype(str)
+    else:
+        labels = dates.dt.strftime('%Y-%m')
+    return labels.where(dates.notna(), UNDATED_PARTITION)
+
+def _partition_overlaps(file_path, date_range):
+    """Indica se a partição pode conter datas do período pedido; um limite None deixa aquele lado aberto"""
+    period = _partition_period(_partition_label(file_path))
+    if period is None:
+        return False
+    start, end = date_range
+    return (end is None or period.start_time.date() <= end) and (start is None or period.end_time.date() >= start)
+
+def _filter_date_range(df, col, date_range):
+    """Mantém as linhas com data dentro do período (inclusive); um limite None não restringe aquele lado"""
+    start, end = date_range
+    days = df[col].dt.normalize()
+    mask = days.notna()
+    if start is not None:
+        mask &= days >= pd.Timestamp(start)
+    if end is not None:
+        mask &= days <= pd.Timestamp(end)
+    return df[mask]
+
+def _date_range_condition(col, date_range):
+    """Condição SQL (ou "" sem limites) e parâmetros do período; um limite None deixa aquele lado aberto"""
+    start, end = date_range
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f'"{col}" >= ?')
+        params.append(start.strftime("%Y-%m-%d"))
+    if end is not None:
+        conditions.append(f'"{col}" <= ?')
+        params.append(end.strftime("%Y-%m-%d"))
+    return " AND ".join(conditions), params
+
+def _csv_files(file_key):
+    """Arquivos CSV da tabela: o arquivo único legado e/ou as partições"""
+    path = DATA_FILES[file_key]["path"]
+    return ([path] if path.exists() else []) + (_partition_files(file_key) if "partition_col" in DATA_FILES[file_key] else [])
+
+def _format_dates(df):
+    """Converte colunas de data para texto no formato gravado nos CSVs"""
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime('%Y-%m-%d')
+    return df
+
+class CSVStorage:
+    """Armazenamento em arquivos CSV separados por ponto e vírgula"""
+
+    def __init__(self):
+        # Serializa escritas concorrentes entre sessões do mesmo processo
+        self._lock = threading.RLock()
+        # Contador local que distingue escritas com mesmo mtime/tamanho
+        self._write_counts = {}
+        self._sequence_lock = threading.Lock()
+
+    def next_id(self, file_key):
+        """Reserva o próximo ID da tabela de forma atômica"""
+        SEQUENCES_PATH.mkdir(exist_ok=True)
+        seq_path = SEQUENCES_PATH / f"{DATA_FILES[file_key]['table']}.seq"
+        with self._sequence_lock, _locked_file(seq_path) as f:
+            f.seek(0)
+            content = f.read().strip()
+            if content:
+                value = int(content) + 1
+            else:
+                # Primeira utilização: parte do maior ID existente
+                value = _initial_sequence_value(self.read(file_key, [DATA_FILES[file_key]["key"]]), file_key) + 1
+            f.seek(0)
+            f.truncate()
+            f.write(str(value))
+            f.flush()
+            os.fsync(f.fileno())
+        return value
+
+    def version(self, file_key):
+        """Versão da tabela derivada do mtime e tamanho do arquivo (ou de cada partição)"""
+        if _is_partitioned(file_key):
+            signature = tuple((p.name, self._signature(p)) for p in self._table_files(file_key))
+            return (signature, self._write_counts.get(file_key, 0))
+        file_path = DATA_FILES[file_key]["path"]
+        try:
+            stat = file_path.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = (0, 0)
+        return signature + (self._write_counts.get(file_key, 0),)
+
+    def _bump(self, file_key):
+        """Registra uma escrita local na tabela"""
+        self._write_counts[file_key] = self._write_counts.get(file_key, 0) + 1
+
+    def read(self, file_key, columns=None, date_range=None):
+        """Lê a tabela, lendo apenas as partições que cobrem o período pedido"""
+        config = DATA_FILES[file_key]
+        part_col = config.get("partition_col")
+        date_range = date_range if part_col else None
+        # A coluna de data é necessária para filtrar as linhas do período
+        read_cols = list(dict.fromkeys([*columns, part_col])) if columns and date_range else columns
+
+        if _is_partitioned(file_key):
+            files = self._table_files(file_key)
+            if date_range:
+                files = [p for p in files if _partition_overlaps(p, date_range)]
+            frames = [self._read_file(file_key, p, read_cols) for p in files]
+            df = conform_frame(pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(), file_key, read_cols)
+        elif not config["path"].exists():
+            logger.info(f"Criando arquivo {config['path'].name}")
+            df = pd.DataFrame(columns=config["cols"])
+            df.to_csv(config["path"], index=False, sep=';')
+            df = conform_frame(df, file_key, read_cols)
+        else:
+            df = self._read_file(file_key, config["path"], read_cols)
+
+        if date_range:
+            df = _filter_date_range(df, part_col, date_range)
+        return df if columns is None else df[list(columns)]
+
+    def iter_chunks(self, file_key, columns=None, date_range=None, chunk_size=10000):
+        """Lê a tabela em blocos de até chunk_size linhas, uma partição (ou um bloco do CSV) por vez"""
+        config = DATA_FILES[file_key]
+        part_col = config.get("partition_col")
+        date_range = date_range if part_col else None
+        read_cols = list(dict.fromkeys([*columns, part_col])) if columns and date_range else columns
+
+        if _is_partitioned(file_key):
+            files = self._table_files(file_key)
+            if date_range:
+                files = [p for p in files if _partition_overlaps(p, date_range)]
+            parts = (self._read_file(file_key, p, read_cols) for p in files)
+        elif config["path"].exists():
+            reader = pd.read_csv(config["path"], sep=';', dtype=str, chunksize=chunk_size)
+            parts = (conform_frame(chunk, file_key, read_cols) for chunk in reader)
+        else:
+            parts = iter(())
+
+        for df in parts:
+            if date_range:
+                df = _filter_date_range(df, part_col, date_range)
+            df = df if columns is None else df[list(columns)]
+            for start in range(0, len(df), chunk_size):
+                yield df.iloc[start:start + chunk_size]
+
+    def read_rows(self, file_key, keys, key_col=None, columns=None):
+        """Lê os registros com as chaves dadas (os arquivos são percorridos, mas só eles são devolvidos)"""
+        key_col = key_col or DATA_FILES[file_key]["key"]
+        read_cols = list(dict.fromkeys([*columns, key_col])) if columns else None
+        keys = {str(k) for k in keys}
+        frames = []
+        for file_path in self._table_files(file_key):
+            df = self._read_file(file_key, file_path, read_cols)
+            df = df[df[key_col].astype(str).isin(keys)]
+            if not df.empty:
+                frames.append(df)
+        df = pd.concat(frames, ignore_index=True) if frames else conform_frame(pd.DataFrame(), file_key, read_cols)
+        return df if columns is None else df[list(columns)]
+
+    def _read_file(self, file_key, file_path, columns=None):
+        """Lê um arquivo da tabela, preferindo o snapshot colunar quando ele está atualizado"""
+        signature = self._signature(file_path)
+        df = self._read_snapshot(file_key, file_path, signature, columns)
+        if df is not None:
+            return df
+
+        df = conform_frame(pd.read_csv(file_path, sep=';', dtype=str), file_key)
+        self._write_snapshot(file_key, file_path, df, signature)
+        return df if columns is None else conform_frame(df, file_key, columns)
+
+    @staticmethod
+    def _signature(file_path):
+        """Identifica o conteúdo atual do CSV pelo mtime e tamanho"""
+        stat = file_path.stat()
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    @staticmethod
+    def _snapshot_path(file_path):
+        try:
+            relative = file_path.parent.relative_to(DATA_PATH)
+        except ValueError:
+            relative = Path()
+        return SNAPSHOT_PATH / relative / f"{_partition_label(file_path)}.parquet"
+
+    def _read_snapshot(self, file_key, file_path, signature, columns):
+        """Lê o snapshot Parquet se ele corresponder à versão atual do CSV"""
+        snapshot_path = self._snapshot_path(file_path)
+        if pq is None or not USE_SNAPSHOTS or not snapshot_path.exists():
+            return None
+        try:
+            metadata = pq.read_schema(snapshot_path).metadata or {}
+            if metadata.get(b'gems_source') != signature.encode():
+                return None
+            available = pq.read_schema(snapshot_path).names
+            wanted = [col for col in columns if col in available] if columns else None
+            df = pq.read_table(snapshot_path, columns=wanted).to_pandas()
+            return df if columns is None else conform_frame(df, file_key, columns)
+        except Exception as e:
+            logger.warning(f"Snapshot {snapshot_path.name} ignorado: {e}")
+            return None
+
+    def _write_snapshot(self, file_key, file_path, df, signature):
+        """Grava o snapshot Parquet do arquivo associado à versão do CSV"""
+        if pq is None or not USE_SNAPSHOTS:
+            return
+        snapshot_path = self._snapshot_path(file_path)
+        try:
+            snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'gems_source': signature.encode()})
+            # Também roda no caminho de leitura, sem trava: o temporário é exclusivo de cada processo/thread
+            with atomic_write(snapshot_path) as tmp_path:
+                pq.write_table(table, tmp_path)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar snapshot {snapshot_path.name}: {e}")
+
+    def write(self, file_key, df):
+        """Reescreve a tabela completa"""
+        with self._lock:
+            if _is_partitioned(file_key):
+                self._write_partitions(file_key, df, replace=True)
+            else:
+                self._write_csv(file_key, df)
+
+    def append(self, file_key, rows):
+        """Acrescenta registros ao final do arquivo (ou da partição) sem reescrevê-lo"""
+        config = DATA_FILES[file_key]
+        with self._lock:
+            if not _is_partitioned(file_key):
+                self._append_csv(file_key, config["path"], pd.DataFrame(rows))
+                return
+            df_rows = pd.DataFrame(rows)
+            targets = self._partition_targets(file_key, df_rows[config["partition_col"]])
+            for file_path, part in df_rows.groupby(targets, sort=False):
+                if file_path.name.endswith('.gz'):
+                    # Partições compactadas não aceitam acréscimo e são reescritas
+                    existing = self._read_raw(file_path)
+                    self._write_csv(file_key, pd.concat([existing, _format_dates(part.copy())], ignore_index=True), file_path)
+                else:
+                    self._append_csv(file_key, file_path, part)
+
+    def _append_csv(self, file_key, file_path, df_rows):
+        """Acrescenta linhas ao CSV alinhadas com o cabeçalho existente"""
+        is_new = not file_path.exists() or file_path.stat().st_size == 0
+        header = DATA_FILES[file_key]["cols"] if is_new else self._read_header(file_path)
+        # Alinha as colunas com o cabeçalho existente do arquivo
+        df_rows = df_rows.reindex(columns=header)
+
+        file_path.parent.mkdir(exist_ok=True)
+        with open(file_path, 'a', encoding='utf-8', newline='') as f:
+            if not is_new and not self._ends_with_newline(file_path):
+                f.write('\n')
+            df_rows.to_csv(f, header=is_new, index=False, sep=';', lineterminator='\n', date_format="%Y-%m-%d")
+            f.flush()
+            os.fsync(f.fileno())
+        self._bump(file_key)
+
+    def exists(self, file_key):
+        """Indica se a tabela já foi gravada alguma vez"""
+        if _partition_dir(file_key).exists():
+            return True
+        return DATA_FILES[file_key]["path"].exists()
+
+    def update(self, file_key, keys, values, key_col=None):
+        """Atualiza as colunas informadas nos registros com as chaves dadas"""
+        key_col = key_col or DATA_FILES[file_key]["key"]
+        with self._lock:
+            for file_path in self._table_files(file_key):
+                df = self._read_raw(file_path)
+                mask = df[key_col].isin([str(k) for k in keys])
+                if not mask.any():
+                    continue
+                for col, value in values.items():
+                    value = _to_db_value(value)
+                    df.loc[mask, col] = pd.NA if value is None else str(value)
+                self._write_csv(file_key, df, file_path)
+
+    def delete(self, file_key, keys, key_col=None):
+        """Remove os registros com as chaves dadas"""
+        key_col = key_col or DATA_FILES[file_key]["key"]
+        with self._lock:
+            for file_path in self._table_files(file_key):
+                df = self._read_raw(file_path)
+                mask = df[key_col].isin([str(k) for k in keys])
+                if mask.any():
+                    self._write_csv(file_key, df[~mask], file_path)
+
+    def increment(self, file_key, rows, sum_cols, count_col):
+        """Soma sum_cols nos registros existentes (inserindo os novos) e remove os que ficam com count_col <= 0"""
+        key_col = DATA_FILES[file_key]["key"]
+        pending = _format_dates(pd.DataFrame(rows)).set_index(key_col)
+        with self._lock:
+            for file_path in self._table_files(file_key):
+                df = self._read_raw(file_path)
+                mask = df[key_col].isin(pending.index)
+                if not mask.any():
+                    continue
+                matched = pending.loc[df.loc[mask, key_col]]
+                for col in pending.columns:
+                    if col in sum_cols:
+                        current = pd.to_numeric(df.loc[mask, col]).fillna(0).astype('int64').to_numpy()
+                        df.loc[mask, col] = (current + matched[col].astype('int64').to_numpy()).astype(str)
+                    else:
+                        # O CSV bruto é só texto: valores numéricos e datas são gravados como em _to_db_value
+                        values = (_to_db_value(value) for value in matched[col])
+                        df.loc[mask, col] = [pd.NA if value is None else str(value) for value in values]
+                keep = ~mask | (pd.to_numeric(df[count_col]) > 0)
+                self._write_csv(file_key, df[keep], file_path)
+                pending = pending.drop(df.loc[mask, key_col].unique())
+            new_rows = pending[pending[count_col] > 0]
+            if not new_rows.empty:
+                self.append(file_key, new_rows.reset_index().to_dict('records'))
+
+    @contextmanager
+    def transaction(self):
+        """Mantém a trava de escrita durante uma sequência de leituras e escritas"""
+        with self._lock:
+            yield
+
+    def compact_partitions(self, file_key, before):
+        """Compacta em um arquivo anual .csv.gz as partições dos anos encerrados antes da data dada"""
+        if not _is_partitioned(file_key):
+            return 0
+        with self._lock:
+            by_year = {}
+            for file_path in self._table_files(file_key):
+                period = _partition_period(_partition_label(file_path))
+                if period is not None and period.year < before.year:
+                    by_year.setdefault(period.year, []).append(file_path)
+
+            compacted = 0
+            for year, files in by_year.items():
+                target = _partition_dir(file_key) / f"{year}.csv.gz"
+                if files == [target]:
+                    continue
+                df = pd.concat([self._read_raw(p) for p in files], ignore_index=True)
+                self._write_csv(file_key, df, target)
+                for file_path in files:
+                    if file_path != target:
+                        file_path.unlink()
+                        self._snapshot_path(file_path).unlink(missing_ok=True)
+                compacted += len(files)
+                logger.info(f"Partições de {year} de {DATA_FILES[file_key]['table']} compactadas: {len(files)} arquivos")
+            return compacted
+
+    def _table_files(self, file_key):
+        """Arquivos que compõem a tabela: o CSV único ou as partições"""
+        if not _is_partitioned(file_key):
+            path = DATA_FILES[file_key]["path"]
+            return [path] if path.exists() else []
+        return _partition_files(file_key)
+
+    def migrate_to_partitions(self, file_key):
+        """Divide o CSV único legado em partições e o renomeia para .bak; retorna quantos registros foram movidos"""
+        legacy_path = DATA_FILES[file_key]["path"]
+        with self._lock:
+            if "partition_col" not in DATA_FILES[file_key] or not legacy_path.exists():
+                return 0
+            df = self._read_raw(legacy_path)
+            # Registros que já estejam em partições são mantidos junto com os do CSV único
+            df_all = pd.concat([*(self._read_raw(p) for p in _partition_files(file_key)), df], ignore_index=True)
+            self._write_partitions(file_key, df_all, replace=True)
+            written = sum(len(self._read_raw(p)) for p in _partition_files(file_key))
+            if written != len(df_all):
+                raise RuntimeError(f"Partições de {legacy_path.name} com {written} registros em vez de {len(df_all)}")
+            legacy_path.rename(legacy_path.with_name(legacy_path.name + '.bak'))
+            logger.info(f"{legacy_path.name} dividido em partições: {len(df)} registros")
+            return len(df)
+
+    def _partition_targets(self, file_key, dates):
+        """Arquivo de partição de cada linha; datas já compactadas continuam no arquivo anual"""
+        part_dir = _partition_dir(file_key)
+        existing = [(p, _partition_period(_partition_label(p))) for p in _partition_files(file_key)]
+        labels = _partition_labels(dates)
+        targets = {}
+        for label in labels.unique():
+            target = part_dir / f"{label}.csv"
+            period = _partition_period(label)
+            if not target.exists() and period is not None:
+                for file_path, file_period in existing:
+                    if file_period is not None and file_period.start_time <= period.start_time and period.end_time <= file_period.end_time:
+                        target = file_path
+                        break
+            targets[label] = target
+        return labels.map(targets)
+
+    def _write_partitions(self, file_key, df, replace=False):
+        """Grava o DataFrame nas partições correspondentes às datas"""
+        part_dir = _partition_dir(file_key)
+        part_dir.mkdir(exist_ok=True)
+        targets = self._partition_targets(file_key, df[DATA_FILES[file_key]["partition_col"]])
+        written = set()
+        for file_path, part in df.groupby(targets, sort=False):
+            self._write_csv(file_key, part, file_path)
+            written.add(file_path)
+        if replace:
+            for file_path in set(_partition_files(file_key)) - written:
+                file_path.unlink()
+                self._snapshot_path(file_path).unlink(missing_ok=True)
+        self._bump(file_key)
+
+    @staticmethod
+    def _read_raw(file_path):
+        """Lê o CSV sem conversão de tipos"""
+        return pd.read_csv(file_path, sep=';', dtype=str)
+
+    def _write_csv(self, file_key, df, file_path=None):
+        """Reescreve o CSV e atualiza o snapshot com o mesmo conteúdo"""
+        file_path = file_path or DATA_FILES[file_key]["path"]
+        df.to_csv(file_path, index=False, sep=';', date_format="%Y-%m-%d")
+        self._bump(file_key)
+        self._write_snapshot(file_key, file_path, conform_frame(df.copy(), file_key), self._signature(file_path))
+
+    @staticmethod
+    def _read_header(file_path):
+        """Lê o cabeçalho do CSV sem carregar o restante do arquivo"""
+        with open(file_path, encoding='utf-8') as f:
+            return f.readline().rstrip('\r\n').split(';')
+
+    @staticmethod
+    def _ends_with_newline(file_path):
+        """Verifica se o último byte do arquivo é uma quebra de linha"""
+        with open(file_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+class SQLiteStorage:
+    """Armazenamento em banco SQLite (modo WAL) com tabelas indexadas"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # Por thread: conexão e profundidade de transaction() aberta
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._initialize()
+
+    def _connect(self):
+        """Retorna a conexão da thread atual, abrindo-a se necessário"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write_transaction(self, conn, immediate=False):
+        """Confirma as escritas no final do bloco (ou as desfaz em caso de erro); dentro de transaction() quem confirma é ela"""
+        if getattr(self._local, 'depth', 0):
+            yield
+            return
+        if immediate:
+            conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def _initialize(self):
+        """Cria tabelas e índices e importa os CSVs existentes na primeira execução"""
+        conn = self._connect()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS storage_meta (key TEXT PRIMARY KEY, value TEXT)")
+            for file_key, config in DATA_FILES.items():
+                table, key_col, types = config["table"], config["key"], config.get("types", {})
+                col_defs = ", ".join(
+                    f'"{col}" {"INTEGER" if types.get(col) == "int" else "TEXT"}'
+                    + (" PRIMARY KEY" if col == key_col else "")
+                    for col in config["cols"]
+                )
+                conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({col_defs})')
+                for col in config.get("indexes", []):
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_{col}" ON "{table}" ("{col}")')
+
+            for file_key, config in DATA_FILES.items():
+                imported = conn.execute(
+                    "SELECT 1 FROM storage_meta WHERE key = ?", (f"imported:{file_key}",)
+                ).fetchone()
+                # Tabelas derivadas são reconstruídas a partir das tabelas base
+                if imported or config.get("derived"):
+                    continue
+                csv_files = _csv_files(file_key)
+                if csv_files:
+                    df = pd.concat(
+                        [pd.read_csv(p, sep=';', dtype=str) for p in csv_files], ignore_index=True
+                    ).reindex(columns=config["cols"])
+                    self._insert(conn, file_key, df.to_dict('records'), replace=True)
+                    self._bump(conn, file_key)
+                    logger.info(f"Tabela {config['table']} importada de {len(csv_files)} arquivo(s) CSV: {len(df)} registros")
+                conn.execute("INSERT INTO storage_meta (key, value) VALUES (?, '1')", (f"imported:{file_key}",))
+
+    def version(self, file_key):
+        """Versão da tabela, incrementada a cada escrita"""
+        row = self._connect().execute(
+            "SELECT value FROM storage_meta WHERE key = ?", (f"version:{file_key}",)
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def exists(self, file_key):
+        """Indica se a tabela já foi gravada alguma vez"""
+        row = self._connect().execute(
+            "SELECT 1 FROM storage_meta WHERE key = ?", (f"version:{file_key}",)
+        ).fetchone()
+        return row is not None
+
+    def next_id(self, file_key):
+        """Reserva o próximo ID da tabela em uma transação exclusiva"""
+        conn = self._connect()
+        seq_key = f"seq:{file_key}"
+        with self._write_transaction(conn, immediate=True):
+            row = conn.execute("SELECT value FROM storage_meta WHERE key = ?", (seq_key,)).fetchone()
+            if row:
+                value = int(row[0]) + 1
+            else:
+                # Primeira utilização: parte do maior ID existente
+                config = DATA_FILES[file_key]
+                current = conn.execute(f'SELECT MAX(CAST("{config["key"]}" AS INTEGER)) FROM "{config["table"]}"').fetchone()[0]
+                value = (int(current) if current is not None else config.get("id_start", 1) - 1) + 1
+            conn.execute(
+                "INSERT INTO storage_meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (seq_key, str(value))
+            )
+        return value
+
+    def _bump(self, conn, file_key):
+        """Incrementa a versão da tabela dentro da transação corrente"""
+        conn.execute(
+            "INSERT INTO storage_meta (key, value) VALUES (?, '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+            (f"version:{file_key}",)
+        )
+
+    def _insert(self, conn, file_key, rows, replace=False):
+        """Insere registros na tabela"""
+        config = DATA_FILES[file_key]
+        columns = config["cols"]
+        col_list = ", ".join(f'"{col}"' for col in columns)
+        placeholders = ", ".join("?" for _ in columns)
+        verb = "INSERT OR REPLACE" if replace else "INSERT"
+        conn.executemany(
+            f'{verb} INTO "{config["table"]}" ({col_list}) VALUES ({placeholders})',
+            [tuple(_to_db_value(row.get(col)) for col in columns) for row in rows]
+        )
+
+    def read(self, file_key, columns=None, date_range=None):
+        """Lê a tabela, opcionalmente apenas as colunas e o período pedidos"""
+        config = DATA_FILES[file_key]
+        col_list = ", ".join(f'"{col}"' for col in columns or config["cols"])
+        query, params = f'SELECT {col_list} FROM "{config["table"]}"', []
+        if date_range and config.get("partition_col"):
+            # O índice na coluna de data restringe a leitura ao período
+            condition, params = _date_range_condition(config["partition_col"], date_range)
+            query += f" WHERE {condition}" if condition else ""
+        df = pd.read_sql_query(query, self._connect(), params=params, dtype=str)
+        return conform_frame(df, file_key, columns)
+
+    def read_rows(self, file_key, keys, key_col=None, columns=None):
+        """Lê os registros com as chaves dadas pelo índice da coluna"""
+        config = DATA_FILES[file_key]
+        key_col = key_col or config["key"]
+        keys = [str(k) for k in keys]
+        if not keys:
+            return conform_frame(pd.DataFrame(), file_key, columns)
+        col_list = ", ".join(f'"{col}"' for col in columns or config["cols"])
+        df = pd.read_sql_query(
+            f'SELECT {col_list} FROM "{config["table"]}" WHERE "{key_col}" IN ({", ".join("?" for _ in keys)})',
+            self._connect(), params=keys, dtype=str
+        )
+        return conform_frame(df, file_key, columns)
+
+    def iter_chunks(self, file_key, columns=None, date_range=None, chunk_size=10000):
+        """Lê a tabela em blocos de até chunk_size linhas, em ordem de data quando há coluna de partição"""
+        config = DATA_FILES[file_key]
+        col_list = ", ".join(f'"{col}"' for col in columns or config["cols"])
+        query, params = f'SELECT {col_list} FROM "{config["table"]}"', []
+        if date_range and config.get("partition_col"):
+            condition, params = _date_range_condition(config["partition_col"], date_range)
+            query += f" WHERE {condition}" if condition else ""
+        if config.get("partition_col"):
+            query += f' ORDER BY "{config["partition_col"]}"'
+        # Conexão própria: o cursor fica aberto enquanto os blocos são consumidos
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            for chunk in pd.read_sql_query(query, conn, params=params, dtype=str, chunksize=chunk_size):
+                yield conform_frame(chunk, file_key, columns)
+        finally:
+            conn.close()
+
+    def compact_partitions(self, file_key, before):
+        """Sem efeito no SQLite: o índice por data já restringe as leituras"""
+        return 0
+
+    def write(self, file_key, df):
+        """Substitui a tabela completa em uma única transação"""
+        conn = self._connect()
+        with self._write_transaction(conn):
+            conn.execute(f'DELETE FROM "{DATA_FILES[file_key]["table"]}"')
+            self._insert(conn, file_key, df.to_dict('records'), replace=True)
+            self._bump(conn, file_key)
+
+    def append(self, file_key, rows):
+        """Insere novos registros"""
+        conn = self._connect()
+        with self._write_transaction(conn):
+            self._insert(conn, file_key, rows)
+            self._bump(conn, file_key)
+
+    def update(self, file_key, keys, values, key_col=None):
+        """Atualiza as colunas informadas nos registros com as chaves dadas"""
+        config = DATA_FILES[file_key]
+        key_col = key_col or config["key"]
+        assignments = ", ".join(f'"{col}" = ?' for col in values)
+        placeholders = ", ".join("?" for _ in keys)
+        conn = self._connect()
+        with self._write_transaction(conn):
+            conn.execute(
+                f'UPDATE "{config["table"]}" SET {assignments} WHERE "{key_col}" IN ({placeholders})',
+                [_to_db_value(v) for v in values.values()] + [str(k) for k in keys]
+            )
+            self._bump(conn, file_key)
+
+    def delete(self, file_key, keys, key_col=None):
+        """Remove os registros com as chaves dadas"""
+        config = DATA_FILES[file_key]
+        key_col = key_col or config["key"]
+        placeholders = ", ".join("?" for _ in keys)
+        conn = self._connect()
+        with self._write_transaction(conn):
+            conn.execute(
+                f'DELETE FROM "{config["table"]}" WHERE "{key_col}" IN ({placeholders})',
+                [str(k) for k in keys]
+            )
+            self._bump(conn, file_key)
+
+    def increment(self, file_key, rows, sum_cols, count_col):
+        """Soma sum_cols nos registros existentes (inserindo os novos) e remove os que ficam com count_col <= 0"""
+        config = DATA_FILES[file_key]
+        columns, key_col = config["cols"], config["key"]
+        col_list = ", ".join(f'"{col}"' for col in columns)
+        assignments = ", ".join(
+            f'"{col}" = "{col}" + excluded."{col}"' if col in sum_cols else f'"{col}" = excluded."{col}"'
+            for col in columns if col != key_col
+        )
+        keys = [str(row[key_col]) for row in rows]
+        conn = self._connect()
+        # Um único upsert por linha: escritas concorrentes na mesma chave somam em vez de se sobrescrever
+        with self._write_transaction(conn):
+            conn.executemany(
+                f'INSERT INTO "{config["table"]}" ({col_list}) VALUES ({", ".join("?" for _ in columns)}) '
+                f'ON CONFLICT("{key_col}") DO UPDATE SET {assignments}',
+                [tuple(_to_db_value(row.get(col)) for col in columns) for row in rows]
+            )
+            conn.execute(
+                f'DELETE FROM "{config["table"]}" WHERE "{count_col}" <= 0 AND "{key_col}" IN ({", ".join("?" for _ in keys)})',
+                keys
+            )
+            self._bump(conn, file_key)
+
+    @contextmanager
+    def transaction(self):
+        """Executa uma sequência de leituras e escritas numa única transação do banco (BEGIN IMMEDIATE ... COMMIT)
+
+        As escritas feitas pela thread dentro do bloco só são confirmadas no final dele e são desfeitas juntas
+        se ele falhar; outras conexões continuam vendo o estado anterior até o COMMIT.
+        """
+        with self._lock:
+            conn = self._connect()
+            depth = getattr(self._local, 'depth', 0)
+            if not depth:
+                conn.execute("BEGIN IMMEDIATE")
+            self._local.depth = depth + 1
+            try:
+                yield
+            except BaseException:
+                if not depth:
+                    conn.rollback()
+                raise
+            else:
+                if not depth:
+                    conn.commit()
+            finally:
+                self._local.depth = depth
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage():
+    """Retorna o backend de armazenamento configurado em STORAGE_BACKEND"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_BACKEND == "sqlite":
+                _storage = SQLiteStorage(SQLITE_PATH)
+            else:
+                _storage = CSVStorage()
+            logger.info(f"Backend de armazenamento: {STORAGE_BACKEND}")
+            if ARCHIVE_AFTER_MONTHS > 0:
+                cutoff = (pd.Timestamp.today() - pd.DateOffset(months=ARCHIVE_AFTER_MONTHS)).date()
+                for file_key in DATA_FILES:
+                    _storage.compact_partitions(file_key, cutoff)
+    return _storage
+
+def main(argv=None):
+    """Linha de comando: python -m utils.storage particionar [--tabela nomination]"""
+    partitioned = [key for key, config in DATA_FILES.items() if "partition_col" in config]
+    parser = argparse.ArgumentParser(description="Manutenção do armazenamento em CSV")
+    commands = parser.add_subparsers(dest="comando", required=True)
+    split = commands.add_parser("particionar", help="Divide os CSVs únicos legados em partições por data (o original fica como .bak)")
+    split.add_argument("--tabela", action="append", choices=partitioned, help="Tabela a dividir (pode repetir; padrão: todas)")
+    args = parser.parse_args(argv)
+
+    storage = get_storage()
+    if not isinstance(storage, CSVStorage):
+        parser.error("o particionamento só se aplica ao backend csv")
+    for file_key in args.tabela or partitioned:
+        moved = storage.migrate_to_partitions(file_key)
+        print(f"{DATA_FILES[file_key]['path'].name}: {moved} registros movidos para {_partition_dir(file_key)}")
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,13 @@ import pandas as pd  # <- Adicionar esta linha
 import base64
 from pathlib import Path
 import time
-from .config import ASSETS_PATH, logger
+import threading
+import hashlib
+import re
+from urllib.parse import quote
+from PIL import Image, ImageOps
+from .config import ASSETS_PATH, STATIC_PATH, THUMBNAIL_PATH, logger
+from .files import atomic_write
 
 def create_custom_header(title, subtitle="", icon="💎"):
     """Cria um header customizado e atraente"""
@@ -14,21 +20,145 @@ def create_custom_header(title, subtitle="", icon="💎"):
     </div>
     """, unsafe_allow_html=True)
 
-def get_pillar_image_path(pillar_name):
-    """Busca o caminho da imagem do pilar baseada no nome"""
+# Cache de ícones do processo: (pilar, tamanho) -> (assinatura do arquivo, HTML)
+_icon_cache = {}
+_icon_cache_lock = threading.Lock()
+_missing_icons = set()
+
+def _pillar_image_file(pillar_name):
+    """Caminho esperado da imagem do pilar, exista ou não"""
     if not pillar_name or pd.isna(pillar_name):
         return None
     
     # Normalizar nome do arquivo
     image_filename = f"{pillar_name.strip().lower().replace(' ', '_').replace('ç', 'c').replace('ã', 'a')}.png"
-    image_path = ASSETS_PATH / "pillar_icons" / image_filename
+    return ASSETS_PATH / "pillar_icons" / image_filename
+
+def _warn_missing_icon(image_path):
+    """Registra a ausência do ícone apenas uma vez por processo"""
+    if image_path not in _missing_icons:
+        _missing_icons.add(image_path)
+        logger.warning(f"Imagem do pilar não encontrada: {image_path}")
+
+def _icon_signature(image_path):
+    """Revalida o cache pelo mtime do ícone ou, se ele não existe, pelo mtime da pasta de ícones"""
+    try:
+        return ('file', image_path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        try:
+            return ('missing', image_path.parent.stat().st_mtime_ns)
+        except FileNotFoundError:
+            return ('missing', None)
+
+def get_pillar_image_path(pillar_name):
+    """Busca o caminho da imagem do pilar baseada no nome"""
+    image_path = _pillar_image_file(pillar_name)
+    if image_path is None:
+        return None
     
     if image_path.exists():
+        _missing_icons.discard(image_path)
         return str(image_path)
     
-    logger.warning(f"Imagem do pilar não encontrada: {image_path}")
+    _warn_missing_icon(image_path)
     return None
 
+# URLs estáticas publicadas: caminho de origem -> (mtime, URL)
+_static_urls = {}
+_static_lock = threading.Lock()
+
+def get_static_asset_url(file_path):
+    """Publica o arquivo em app/static com hash do conteúdo no nome e retorna a URL relativa"""
+    if not st.get_option("server.enableStaticServing"):
+        return None
+    file_path = Path(file_path)
+    try:
+        mtime = file_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    
+    cached = _static_urls.get(file_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    try:
+        content = file_path.read_bytes()
+        # O hash no nome muda a URL quando o conteúdo muda: o navegador nunca reaproveita uma cópia antiga
+        # (o Streamlit não envia Cache-Control; a revalidação segue por ETag/Last-Modified)
+        name = f"{file_path.stem}.{hashlib.sha256(content).hexdigest()[:12]}{file_path.suffix}"
+        target = STATIC_PATH / name
+        with _static_lock:
+            if not target.exists():
+                STATIC_PATH.mkdir(exist_ok=True)
+                with atomic_write(target) as tmp_path:
+                    tmp_path.write_bytes(content)
+                # Remove versões anteriores do mesmo arquivo
+                for old in STATIC_PATH.glob(f"{file_path.stem}.*{file_path.suffix}"):
+                    if old != target:
+                        old.unlink(missing_ok=True)
+            url = f"app/static/{quote(name)}"
+            _static_urls[file_path] = (mtime, url)
+    except OSError as e:
+        logger.error(f"Erro ao publicar {file_path.name} em {STATIC_PATH}: {e}")
+        return None
+    return url
+
+# Miniaturas geradas: (origem, largura, altura, formato) -> (mtime da origem, caminho da miniatura)
+_thumbnails = {}
+_thumbnail_lock = threading.Lock()
+
+def get_thumbnail(image_path, width, height=None, fmt=None):
+    """Caminho de uma miniatura do arquivo, gerada só na primeira vez por versão da imagem.
+
+    Com altura, a imagem é recortada ao centro (como object-fit: cover); sem ela, mantém a proporção.
+    Em caso de erro, retorna o próprio arquivo original.
+    """
+    image_path = Path(image_path)
+    fmt = (fmt or image_path.suffix.lstrip('.')).upper()
+    key = (image_path, width, height, fmt)
+    try:
+        mtime = image_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return image_path
+    
+    cached = _thumbnails.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    suffix = '.jpg' if fmt == 'JPEG' else f".{fmt.lower()}"
+    target = THUMBNAIL_PATH / f"{image_path.stem}_{width}x{height or 'auto'}{suffix}"
+    with _thumbnail_lock:
+        try:
+            if not target.exists() or target.stat().st_mtime_ns < mtime:
+                with Image.open(image_path) as img:
+                    if height:
+                        thumb = ImageOps.fit(img, (width, height), Image.LANCZOS)
+                    elif width < img.width or suffix != image_path.suffix.lower():
+                        thumb = img.copy()
+                        thumb.thumbnail((width, img.height), Image.LANCZOS)
+                    else:
+                        # Já é menor que o pedido e no mesmo formato: usa o original
+                        _thumbnails[key] = (mtime, image_path)
+                        return image_path
+                THUMBNAIL_PATH.mkdir(parents=True, exist_ok=True)
+                with atomic_write(target) as tmp_path:
+                    thumb.save(tmp_path, fmt, **({'quality': 85} if fmt in ('WEBP', 'JPEG') else {'optimize': True}))
+                logger.info(f"Miniatura gerada: {target.name}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao gerar miniatura de {image_path.name}: {e}")
+            return image_path
+        _thumbnails[key] = (mtime, target)
+    return target
+
+def get_image_source(image_path, width=None, fmt=None):
+    """Caminho local para st.image; com largura, a miniatura em 2x (telas de alta densidade) em vez do original.
+
+    URLs de app/static ficam restritas ao HTML (<img>): antes do Streamlit 1.55, st.image as trata como arquivo local.
+    """
+    if width:
+        image_path = get_thumbnail(image_path, width * 2, fmt=fmt)
+    return str(image_path)
+
 def get_image_base64(image_path):
     """Converte imagem para base64"""
     try:
@@ -40,18 +170,40 @@ def get_image_base64(image_path):
 
 def display_pillar_icon(pillar_name, size="40px"):
     """Exibe o ícone do pilar com fallback"""
-    image_path = get_pillar_image_path(pillar_name)
+    fallback = f'<div style="width: {size}; height: {size}; background: var(--accent-color); border-radius: 8px; display: flex; align-items: center; justify-content: center; font-size: 18px;">🏛️</div>'
+    image_path = _pillar_image_file(pillar_name)
+    if image_path is None:
+        return fallback
     
-    if image_path:
-        try:
-            base64_str = get_image_base64(image_path)
-            if base64_str:
-                return f'<img src="data:image/png;base64,{base64_str}" class="pillar-icon" style="width: {size}; height: {size};">'
-        except Exception as e:
-            logger.error(f"Erro ao exibir ícone do pilar {pillar_name}: {e}")
+    # O ícone só é publicado novamente se o arquivo mudar; ausências também ficam em cache
+    key = (pillar_name, size)
+    signature = _icon_signature(image_path)
+    cached = _icon_cache.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+    
+    html = fallback
+    if signature[0] == 'file':
+        _missing_icons.discard(image_path)
+        # Miniaturas quadradas em 1x e 2x no tamanho exibido; tamanhos fora de px usam o original
+        match = re.fullmatch(r"(\d+)px", size.strip())
+        px = int(match.group(1)) if match else None
+        thumb_1x = get_thumbnail(image_path, px, px) if px else image_path
+        thumb_2x = get_thumbnail(image_path, px * 2, px * 2) if px else image_path
+        src = get_static_asset_url(thumb_1x)
+        srcset = f' srcset="{src} 1x, {get_static_asset_url(thumb_2x) or src} 2x"' if src and px else ""
+        if not src:
+            # Sem static serving, o ícone segue embutido como data URI (só a versão 2x)
+            base64_str = get_image_base64(thumb_2x)
+            src = f"data:image/png;base64,{base64_str}" if base64_str else None
+        if src:
+            html = f'<img src="{src}"{srcset} class="pillar-icon" style="width: {size}; height: {size};">'
+    else:
+        _warn_missing_icon(image_path)
     
-    # Fallback para emoji/ícone padrão
-    return f'<div style="width: {size}; height: {size}; background: var(--accent-color); border-radius: 8px; display: flex; align-items: center; justify-content: center; font-size: 18px;">🏛️</div>'
+    with _icon_cache_lock:
+        _icon_cache[key] = (signature, html)
+    return html
 
 def get_cover_image():
     """Busca a imagem da capa"""